@@ -3,13 +3,14 @@
 
 TTS音声合成、TextGrid生成、音声パイプラインを提供する。
 """
-from audio.pipeline import generate_audio_with_textgrid
+from audio.pipeline import generate_audio_files, generate_audio_with_textgrid
 from audio.tts import (
     gen_sound_file,
     convert_wav_to_mp3,
 )
 
 __all__ = [
+    "generate_audio_files",
     "generate_audio_with_textgrid",
     "gen_sound_file",
     "convert_wav_to_mp3",
@@ -63,7 +63,7 @@ def _ensure_voicevox_dict() -> None:
         logger.warning(f"VOICEVOXユーザー辞書の確認に失敗しました: {e}")
 
 
-def generate_audio_with_textgrid(
+def generate_audio_files(
         adapter: SourceAdapter,
         reading_text_path: str,
         wav_path: str,
@@ -72,10 +72,10 @@ def generate_audio_with_textgrid(
         lang_config: LanguageConfig | None = None
 ) -> None:
     """
-    音声生成パイプラインを実行する。
+    読み上げテキスト→WAV→MP3までの音声生成を行う（TextGrid生成は含まない）。
 
-    ソースファイルから読み上げテキストを生成し、言語に応じたTTSエンジンで
-    音声ファイルを作成、MP3に変換後、TextGridを生成します。
+    MFAによるTextGrid生成と分けて呼び出せるよう、パイプラインの前半を切り出したもの。
+    フォルダ処理の並列実行では、この部分のみを複数プロセスで実行する。
 
     Parameters
     ----------
@@ -101,8 +101,6 @@ def generate_audio_with_textgrid(
         音声生成に失敗した場合。
     ConversionError
         MP3変換に失敗した場合。
-    TextGridError
-        TextGrid生成に失敗した場合。
     """
     # 1. 読み上げ用テキストを生成
     adapter.generate_reading_text(reading_text_path)
@@ -119,5 +117,50 @@ def generate_audio_with_textgrid(
     # 3. WAVをMP3に変換
     convert_wav_to_mp3(wav_path, mp3_path)
 
+
+def generate_audio_with_textgrid(
+        adapter: SourceAdapter,
+        reading_text_path: str,
+        wav_path: str,
+        mp3_path: str,
+        rate: int = PRIMARY_SOUND_RATE,
+        lang_config: LanguageConfig | None = None
+) -> None:
+    """
+    音声生成パイプラインを実行する。
+
+    ソースファイルから読み上げテキストを生成し、言語に応じたTTSエンジンで
+    音声ファイルを作成、MP3に変換後、TextGridを生成します。
+
+    Parameters
+    ----------
+    adapter : SourceAdapter
+        入力ソースのアダプター。
+    reading_text_path : str
+        読み上げ用テキストファイルの出力パス。
+    wav_path : str
+        WAV音声ファイルの出力パス。
+    mp3_path : str
+        MP3音声ファイルの出力パス。
+    rate : int, optional
+        読み上げ速度（パーセント）。デフォルトはPRIMARY_SOUND_RATE。
+        VOICEVOXのみで使用。
+    lang_config : LanguageConfig | None, optional
+        言語設定。Noneの場合はデフォルト（日本語/VOICEVOX）を使用。
+
+    Raises
+    ------
+    FileNotFoundError_
+        入力ファイルが存在しない場合。
+    AudioGenerationError
+        音声生成に失敗した場合。
+    ConversionError
+        MP3変換に失敗した場合。
+    TextGridError
+        TextGrid生成に失敗した場合。
+    """
+    # 1〜3. 読み上げテキスト→WAV→MP3
+    generate_audio_files(adapter, reading_text_path, wav_path, mp3_path, rate, lang_config)
+
     # 4. TextGridを生成（言語に応じたMFAモデルを使用）
     generate_textgrid_from_files_auto(reading_text_path, mp3_path, lang_config)
@@ -27,6 +27,8 @@ from text.common import (
     FRAME_PATTERN,
     IMAGE_PATTERN,
     READING_SUB_PATTERN,
+    XHTML_RUBY_PATTERN,
+    XHTML_TAG_PATTERN,
     strip_formatting,
 )
 from core.config import PUNCTUATION_CHARS
@@ -1425,14 +1427,14 @@ def _extract_span_reading(span_content: str) -> str:
     """
     import re
     # ruby要素: <ruby><rb>親字</rb><rt>読み</rt></ruby> → 読み
-    result = re.sub(r'<ruby><rb>.*?</rb><rt>(.*?)</rt></ruby>', r'\1', span_content)
+    result = XHTML_RUBY_PATTERN.sub(r'\2', span_content)
     # yomikae要素（seg内）: <span data-yomi="読み">表示</span> → 読み
     result = re.sub(r'<span data-yomi="([^"]*)">.*?</span>', r'\1', result)
     # img要素: alt属性値を抽出して置換（タグ除去前に処理）
     result = re.sub(r'<img\b[^>]*\balt="([^"]*)"[^>]*/>', r'\1', result)
     result = re.sub(r'<img\b[^>]*/>', '', result)  # alt属性なし
     # その他すべてのタグを除去
-    result = re.sub(r'<[^>]+>', '', result)
+    result = XHTML_TAG_PATTERN.sub('', result)
     return result.lower()
 
 
@@ -36,6 +36,11 @@ def set_log_level(level: LogLevel) -> None:
     _logger.setLevel(level)
 
 
+def is_enabled(level: LogLevel) -> bool:
+    """指定レベルのログが出力されるかを返す（メッセージ生成の省略判定用）。"""
+    return _logger.isEnabledFor(level)
+
+
 def debug(message: str) -> None:
     """デバッグメッセージを出力する。"""
     _logger.debug(message)
@@ -63,6 +63,7 @@ MESSAGES: dict[str, dict[str, str]] = {
         "reserved_filenames_in_list": "作業用ファイル名として予約されているファイルが含まれています: {names}\nこれらのファイル名を変更してください。",
         "no_files_in_folder": "{folder} に{ext}ファイルが見つかりません。",
         "no_commonmark_in_folder": "{folder} に.txtまたは.mdファイルが見つかりません。",
+        "directory_remove_failed": "ディレクトリを削除できません: {path}\n{detail}",
 
         # 表示名
         "display_commonmark": "CommonMark拡張",
@@ -202,6 +203,7 @@ MESSAGES: dict[str, dict[str, str]] = {
         "reserved_filenames_in_list": "Reserved filenames found: {names}\nPlease rename these files.",
         "no_files_in_folder": "No {ext} files found in {folder}.",
         "no_commonmark_in_folder": "No .txt or .md files found in {folder}.",
+        "directory_remove_failed": "Could not remove directory: {path}\n{detail}",
 
         # Display names
         "display_commonmark": "CommonMark extended",
@@ -323,6 +325,8 @@ def _detect_ui_language() -> str:
     return "ja" if loc.lower().startswith("ja") else "en"
 
 _ui_lang = _detect_ui_language()
+# 現在の言語のメッセージ辞書（msg() で言語ごとの辞書を引き直さないよう保持する）
+_catalog: dict[str, str] = MESSAGES[_ui_lang]
 
 
 def set_ui_language(lang_code: str) -> None:
@@ -337,8 +341,9 @@ def set_ui_language(lang_code: str) -> None:
         言語コード（例: "ja_JP", "en_US", "de_DE"）。
         "ja" で始まる場合は日本語、それ以外は英語を使用する。
     """
-    global _ui_lang
+    global _ui_lang, _catalog
     _ui_lang = "ja" if lang_code.startswith("ja") else "en"
+    _catalog = MESSAGES[_ui_lang]
 
 
 def msg(key: str, **kwargs) -> str:
@@ -357,7 +362,7 @@ def msg(key: str, **kwargs) -> str:
     str
         ロケールに応じたメッセージ文字列
     """
-    template = MESSAGES[_ui_lang].get(key, key)
+    template = _catalog.get(key, key)
     if kwargs:
         return template.format(**kwargs)
     return template
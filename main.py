@@ -3,8 +3,13 @@ EPUB生成ツールのメインモジュール。
 
 テキスト/XML/CommonMarkファイルからMedia Overlay付きEPUB3を生成する。
 """
+import errno
+import os
 import re
 import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
@@ -27,12 +32,14 @@ from core.metadata_reader import (
     MetadataFileNotFoundError,
     MetadataTitleMissingError,
 )
-from audio.pipeline import generate_audio_with_textgrid
+from audio.pipeline import generate_audio_files, generate_audio_with_textgrid
+from audio.textgrid.generator import generate_textgrid_from_files_auto
 from epub.builder import build_complete_epub
 from epub.builder_multi import build_multi_epub
 from epub.builder_commonmark import build_commonmark_epub, build_commonmark_multi_epub
 from parsers.commonmark import get_book_title
 from parsers.source_adapter import SourceAdapter, CommonMarkSourceAdapter
+from mathconv.converter import MathProcessor, get_current_processor, set_current_processor
 
 
 # =============================================================================
@@ -92,12 +99,12 @@ class ProcessingMode(Enum):
 # =============================================================================
 
 # 作業用ファイル名（予約済み）
-RESERVED_FILENAMES: set[str] = {
+RESERVED_FILENAMES: frozenset[str] = frozenset({
     f"{AUDIO_BASE_NAME}.txt",
     f"{AUDIO_BASE_NAME}{PRIMARY_SOUND_SUFFIX}",
     f"{AUDIO_BASE_NAME}{SECONDARY_SOUND_SUFFIX}",
     f"{AUDIO_BASE_NAME}.TextGrid",
-}
+})
 
 # 中間ファイル（単一ファイル処理用）
 INTERMEDIATE_FILES_SINGLE: list[Path] = [
@@ -116,6 +123,15 @@ INTERMEDIATE_FILES_MULTI: list[Path] = [
     Path("work_multi"),
 ]
 
+# 自然順ソート用の数字列パターン
+_DIGITS_PATTERN = re.compile(r'(\d+)')
+
+# フォルダ処理の並列実行を有効にする環境変数（"1"で有効）
+PARALLEL_ENV_VAR = "KERT_PARALLEL"
+# 並列実行時の音声生成ワーカー数を指定する環境変数（未指定・不正値は既定値）
+PARALLEL_WORKERS_ENV_VAR = "KERT_PARALLEL_WORKERS"
+DEFAULT_PARALLEL_WORKERS = 2
+
 
 # =============================================================================
 # データクラス
@@ -161,20 +177,100 @@ class ProcessingContext:
         )
 
 
+@dataclass
+class SourceTask:
+    """1ファイル分の音声・TextGrid生成タスク（プロセスプールに渡せるようpickle可能）。"""
+    adapter: SourceAdapter
+    work_txt: Path
+    work_wav: Path
+    work_mp3: Path
+    textgrid_dst: Path
+    lang_config: LanguageConfig | None
+    math_proc: MathProcessor | None = None
+
+
 # =============================================================================
 # ユーティリティ関数
 # =============================================================================
 
-def natural_sort_key(path: Path) -> list:
+def natural_sort_key(path: Path) -> tuple:
     """
     自然順ソートのためのキー関数。
 
     ファイル名内の数字を数値として扱い、人間が期待する順序でソートする。
     例: file1, file2, file10 → file1, file2, file10 (文字列だと file1, file10, file2)
+
+    分割結果は奇数番目が常に数字列になるため、位置で型を決めたタプルを返す
+    （比較はC実装のタプル比較で行われる）。
+    """
+    parts = _DIGITS_PATTERN.split(path.name)
+    return tuple(int(p) if i % 2 else p.lower() for i, p in enumerate(parts))
+
+
+def _enumerate_sources(folder: Path, suffixes: tuple[str, ...]) -> list[Path]:
+    """
+    フォルダ直下から指定拡張子の通常ファイルを収集し、自然順で返す。
+
+    フォルダの存在確認・ファイル収集・予約済みファイル名のチェックを
+    1回の os.scandir で行う。DirEntry はディレクトリ読み取り時に得た種別情報を
+    保持するため、ファイルごとに追加のstatを発行しない。
+    拡張子の比較はOSの大文字小文字規則に従う。
+
+    Raises
+    ------
+    EpubGenerationError
+        フォルダが存在しない場合、または予約済みファイル名のファイルが含まれる場合。
+    """
+    try:
+        it = os.scandir(folder)
+    except (FileNotFoundError, NotADirectoryError):
+        raise EpubGenerationError(msg("folder_not_found", path=folder))
+
+    files: list[Path] = []
+    reserved: list[str] = []
+    with it:
+        for entry in it:
+            if not (entry.is_file() and os.path.normcase(entry.name).endswith(suffixes)):
+                continue
+            if entry.name in RESERVED_FILENAMES:
+                reserved.append(entry.name)
+            files.append(Path(entry.path))
+
+    if reserved:
+        names = ", ".join(sorted(reserved))
+        raise EpubGenerationError(msg("reserved_filenames_in_list", names=names))
+    files.sort(key=natural_sort_key)
+    return files
+
+
+def _fast_rmtree(path: Path) -> None:
+    """
+    ディレクトリを再帰的に削除する（存在しない場合は何もしない）。
+
+    POSIX環境では `rm -rf` に委譲し、ファイル数に比例するPython側の
+    stat/unlinkループを避ける。Windowsまたは `rm` がない環境では
+    shutil.rmtree を使う。
+
+    Raises
+    ------
+    OSError
+        削除に失敗した場合（shutil.rmtree と同様に対象のパスを含む）。
     """
-    def convert(text: str):
-        return int(text) if text.isdigit() else text.lower()
-    return [convert(c) for c in re.split(r'(\d+)', path.name)]
+    if not path.exists():
+        return
+    if sys.platform != "win32" and shutil.which("rm"):
+        result = subprocess.run(
+            ["rm", "-rf", "--", str(path)],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise OSError(
+                errno.EIO,
+                msg("directory_remove_failed", path=path, detail=result.stderr.strip()),
+                str(path),
+            )
+    else:
+        shutil.rmtree(path)
 
 
 def _log_processing_start(start_time: datetime) -> None:
@@ -202,26 +298,12 @@ def _validate_file_exists(file_path: Path) -> None:
         raise EpubGenerationError(msg("file_not_found", path=file_path))
 
 
-def _validate_folder_exists(folder_path: Path) -> None:
-    """フォルダの存在をチェックする。"""
-    if not folder_path.exists() or not folder_path.is_dir():
-        raise EpubGenerationError(msg("folder_not_found", path=folder_path))
-
-
 def _validate_not_reserved(filename: str) -> None:
     """作業用ファイル名との衝突をチェックする。"""
     if filename in RESERVED_FILENAMES:
         raise EpubGenerationError(msg("reserved_filename", name=filename))
 
 
-def _validate_no_reserved_files(files: list[Path]) -> None:
-    """ファイルリスト内に予約済みファイル名がないかチェックする。"""
-    reserved = [f for f in files if f.name in RESERVED_FILENAMES]
-    if reserved:
-        names = ", ".join(f.name for f in reserved)
-        raise EpubGenerationError(msg("reserved_filenames_in_list", names=names))
-
-
 # =============================================================================
 # 中間ファイル処理
 # =============================================================================
@@ -245,8 +327,7 @@ def _handle_intermediate_files(
     """
     if keep:
         intermediate_dir = output_dir / "intermediate_products"
-        if intermediate_dir.exists():
-            shutil.rmtree(intermediate_dir)
+        _fast_rmtree(intermediate_dir)
         intermediate_dir.mkdir()
 
         for item in items:
@@ -294,17 +375,59 @@ def _prompt_choice(
     logger.separator("-")
 
     choice = input(msg("choice_prompt", n=len(options), d=default)).strip()
+    return _parse_choice(choice, len(options), default)
+
+
+def _prompt_yesno(
+    prompt: str,
+    options: tuple[str, str],
+    default: int = 1
+) -> int:
+    """
+    2択の選択肢を表示してユーザー入力を取得する。
+
+    入力の大半は空（デフォルト）か "1"/"2" のため、その場合は数値変換を行わない。
+    それ以外の入力は _prompt_choice と同じ規則で解釈する。
+
+    Parameters
+    ----------
+    prompt : str
+        質問文
+    options : tuple[str, str]
+        選択肢1と選択肢2
+    default : int
+        デフォルト値（1または2）
+
+    Returns
+    -------
+    int
+        選択されたインデックス（1または2）
+    """
+    print(f"{prompt}\n  1: {options[0]}\n  2: {options[1]}")
+    logger.separator("-")
 
+    choice = input(msg("choice_prompt", n=2, d=default)).strip()
+    if not choice:
+        return default
+    if choice == "1":
+        return 1
+    if choice == "2":
+        return 2
+    return _parse_choice(choice, 2, default)
+
+
+def _parse_choice(choice: str, n: int, default: int) -> int:
+    """選択肢番号の入力文字列を解釈する。範囲外・不正な入力はデフォルト値を返す。"""
     if not choice:
         return default
 
     try:
         value = int(choice)
-        if 1 <= value <= len(options):
+        if 1 <= value <= n:
             return value
-        print(msg("invalid_value", n=len(options), d=default))
+        print(msg("invalid_value", n=n, d=default))
     except ValueError:
-        print(msg("invalid_input", n=len(options), d=default))
+        print(msg("invalid_input", n=n, d=default))
 
     return default
 
@@ -336,11 +459,11 @@ def _prompt_language() -> tuple[LanguageConfig, int]:
 
 def _prompt_input_format() -> tuple[InputFormat, int]:
     """入力形式選択を行う。"""
-    options = [
+    options = (
         msg("opt_commonmark"),
         msg("opt_xml"),
-    ]
-    choice = _prompt_choice(msg("select_input_format"), options, default=1)
+    )
+    choice = _prompt_yesno(msg("select_input_format"), options, default=1)
 
     format_map = {
         1: InputFormat.COMMONMARK_EXT,
@@ -359,11 +482,11 @@ def _get_highlight_mode(input_format: InputFormat) -> str:
 
 def _prompt_processing_mode(file_type: str) -> tuple[ProcessingMode, int]:
     """処理モード選択を行う。"""
-    options = [
+    options = (
         msg("opt_single", type=file_type),
         msg("opt_folder", type=file_type),
-    ]
-    choice = _prompt_choice(msg("select_processing_mode"), options, default=1)
+    )
+    choice = _prompt_yesno(msg("select_processing_mode"), options, default=1)
 
     mode = ProcessingMode.SINGLE_FILE if choice == 1 else ProcessingMode.FOLDER
     return mode, choice
@@ -385,8 +508,8 @@ def _prompt_keep_intermediate(output_dir: Path) -> bool:
     print(msg("keep_intermediate_question"))
     print(f"  {msg('keep_intermediate_dest', path=intermediate_dir)}")
 
-    options = [msg("opt_keep_no"), msg("opt_keep_yes")]
-    choice = _prompt_choice("", options, default=1)
+    options = (msg("opt_keep_no"), msg("opt_keep_yes"))
+    choice = _prompt_yesno("", options, default=1)
     return choice == 2
 
 
@@ -404,18 +527,130 @@ def _setup_work_directory() -> tuple[Path, Path, Path]:
         (work_dir, textgrid_folder, audio_folder)
     """
     work_dir = Path("work_multi")
-    if work_dir.exists():
-        shutil.rmtree(work_dir)
-    work_dir.mkdir()
-
     textgrid_folder = work_dir / "textgrid"
     audio_folder = work_dir / "audio"
-    textgrid_folder.mkdir()
-    audio_folder.mkdir()
+
+    # 作業用フォルダはサブフォルダ作成時に親として作られる
+    _fast_rmtree(work_dir)
+    for folder in (textgrid_folder, audio_folder):
+        folder.mkdir(parents=True, exist_ok=True)
 
     return work_dir, textgrid_folder, audio_folder
 
 
+def _is_parallel_enabled(lang_config: LanguageConfig | None) -> bool:
+    """
+    フォルダ処理の音声生成を並列実行するかどうかを判定する。
+
+    環境変数 KERT_PARALLEL=1 の場合のみ有効。並列化するのはTTSとMP3変換のみで、
+    MFAによるTextGrid生成は常に逐次実行する。VOICEVOXは単一エンジンへの
+    HTTP要求でユーザー辞書登録も共有するため、常に逐次実行する。
+    """
+    if os.environ.get(PARALLEL_ENV_VAR) != "1":
+        return False
+    return lang_config is not None and lang_config.tts_engine != "voicevox"
+
+
+def _log_file_header(src_file: Path) -> None:
+    """
+    フォルダ処理でのファイル単位の開始ログを出力する。
+
+    INFOが無効な場合はメッセージの生成自体を省略する。
+    """
+    if not logger.is_enabled(logger.LogLevel.INFO):
+        return
+    logger.separator("=", 50)
+    logger.info(msg("processing_file", name=src_file.name))
+
+
+def _make_source_task(
+    adapter: SourceAdapter,
+    base_name: str,
+    work_dir: Path,
+    textgrid_folder: Path,
+    audio_folder: Path,
+    lang_config: LanguageConfig | None
+) -> SourceTask:
+    """作業用フォルダ内の出力パスを割り当ててタスクを生成する。"""
+    return SourceTask(
+        adapter=adapter,
+        work_txt=work_dir / f"{base_name}.txt",
+        work_wav=work_dir / f"{base_name}.wav",
+        work_mp3=audio_folder / f"{base_name}.mp3",
+        textgrid_dst=textgrid_folder / f"{base_name}.TextGrid",
+        lang_config=lang_config,
+        math_proc=get_current_processor(),
+    )
+
+
+def _parallel_worker_count(task_count: int) -> int:
+    """
+    並列実行時の音声生成ワーカー数を決める。
+
+    環境変数 KERT_PARALLEL_WORKERS（正の整数）で指定でき、未指定・不正値の場合は
+    DEFAULT_PARALLEL_WORKERS を使う。タスク数とCPU数を上限とする。
+    """
+    try:
+        workers = int(os.environ.get(PARALLEL_WORKERS_ENV_VAR, DEFAULT_PARALLEL_WORKERS))
+    except ValueError:
+        workers = DEFAULT_PARALLEL_WORKERS
+    if workers < 1:
+        workers = DEFAULT_PARALLEL_WORKERS
+    return max(1, min(workers, task_count, os.cpu_count() or 1))
+
+
+def _process_one_source(task: SourceTask) -> None:
+    """
+    1ファイル分の音声生成（読み上げテキスト・WAV・MP3）とWAV削除を行う。
+
+    プロセスプールから呼び出せるようトップレベルに定義する。数式プレースホルダーの
+    展開に必要なMathProcessorはタスク経由でワーカーに引き継ぐ。
+    TextGrid生成（MFA）は含まず、本プロセスで _align_one_source により行う。
+    """
+    if task.math_proc is not None:
+        set_current_processor(task.math_proc)
+
+    generate_audio_files(
+        task.adapter, str(task.work_txt), str(task.work_wav), str(task.work_mp3),
+        lang_config=task.lang_config
+    )
+
+    # WAV削除（TextGrid生成はMP3を使う）
+    task.work_wav.unlink(missing_ok=True)
+
+
+def _align_one_source(task: SourceTask) -> None:
+    """
+    1ファイル分のTextGrid生成（MFA）とTextGridの移動を行う。
+
+    MFAは共有のルートディレクトリに作業データを置き、自身もジョブを並列実行するため、
+    常に本プロセスから1件ずつ呼び出す。
+    """
+    generate_textgrid_from_files_auto(str(task.work_txt), str(task.work_mp3), task.lang_config)
+
+    # TextGrid移動（移動先は同じ作業フォルダ内なのでos.replaceで足りる）
+    try:
+        os.replace(task.work_mp3.with_suffix(".TextGrid"), task.textgrid_dst)
+    except FileNotFoundError:
+        pass
+
+
+def _process_sources_parallel(tasks: list[SourceTask]) -> None:
+    """
+    音声生成をプロセスプールで並列実行し、TextGrid生成は本プロセスで逐次実行する。
+
+    音声生成が終わったタスクから入力順にMFAにかけ、残りの音声生成と重ねる。
+    いずれかが失敗した場合は未着手の音声生成を取り消し、例外を呼び出し元に伝播する。
+    """
+    with ProcessPoolExecutor(max_workers=_parallel_worker_count(len(tasks))) as executor:
+        try:
+            for task, _ in zip(tasks, executor.map(_process_one_source, tasks)):
+                _align_one_source(task)
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
 # =============================================================================
 # 処理関数
 # =============================================================================
@@ -477,8 +712,9 @@ def process_folder(
     """フォルダ内の複数ファイル（テキストまたはXML）からEPUBを生成する。"""
     folder_path = Path(source_folder)
 
-    # バリデーション
-    _validate_folder_exists(folder_path)
+    # ソースファイル収集（フォルダの存在・予約済みファイル名のチェックを含む）
+    file_ext = "*.xml" if is_xml else "*.txt"
+    source_files = _enumerate_sources(folder_path, (".xml",) if is_xml else (".txt",))
 
     # コンテキスト生成
     ctx = ProcessingContext.create(folder_path, lang_config, keep_intermediate, is_folder=True, mode_string=mode_string)
@@ -487,41 +723,35 @@ def process_folder(
     # メタデータ
     metadata = load_metadata_for_folder(source_folder)
 
-    # ソースファイル収集
-    file_ext = "*.xml" if is_xml else "*.txt"
-    source_files = sorted(folder_path.glob(file_ext), key=natural_sort_key)
-
     if not source_files:
         raise EpubGenerationError(msg("no_files_in_folder", folder=source_folder, ext=file_ext))
 
-    _validate_no_reserved_files(source_files)
     logger.info(msg("file_count", count=len(source_files), ext=file_ext))
 
     # 作業用フォルダ
     work_dir, textgrid_folder, audio_folder = _setup_work_directory()
 
     # 各ファイル処理
+    # アダプター生成は数式エントリーを共有するため常に本プロセスで行い、
+    # 並列実行時は音声生成のみをプロセスプールに渡す
+    parallel = _is_parallel_enabled(lang_config)
     adapters: list[SourceAdapter] = []
+    tasks: list[SourceTask] = []
     for src_file in source_files:
-        base_name = src_file.stem
-        logger.separator("=", 50)
-        logger.info(msg("processing_file", name=src_file.name))
+        _log_file_header(src_file)
 
         adapter = SourceAdapter.create(str(src_file), is_xml)
         adapters.append(adapter)
 
-        work_txt = work_dir / f"{base_name}.txt"
-        work_wav = work_dir / f"{base_name}.wav"
-        work_mp3 = audio_folder / f"{base_name}.mp3"
-
-        generate_audio_with_textgrid(adapter, str(work_txt), str(work_wav), str(work_mp3), lang_config=lang_config)
+        task = _make_source_task(adapter, src_file.stem, work_dir, textgrid_folder, audio_folder, lang_config)
+        if parallel:
+            tasks.append(task)
+        else:
+            _process_one_source(task)
+            _align_one_source(task)
 
-        # TextGrid移動、WAV削除
-        tg_src = audio_folder / f"{base_name}.TextGrid"
-        if tg_src.exists():
-            shutil.move(tg_src, textgrid_folder / f"{base_name}.TextGrid")
-        if work_wav.exists():
-            work_wav.unlink()
+    if tasks:
+        _process_sources_parallel(tasks)
 
     # EPUB生成
     build_multi_epub(
@@ -604,8 +834,8 @@ def process_commonmark_folder(
     """フォルダ内の複数CommonMarkファイルからEPUBを生成する。"""
     folder_path = Path(source_folder)
 
-    # バリデーション
-    _validate_folder_exists(folder_path)
+    # ソースファイル収集（.txt と .md、フォルダの存在・予約済みファイル名のチェックを含む）
+    source_files = _enumerate_sources(folder_path, (".txt", ".md"))
 
     # コンテキスト生成
     ctx = ProcessingContext.create(folder_path, lang_config, keep_intermediate, is_folder=True, mode_string=mode_string)
@@ -614,42 +844,35 @@ def process_commonmark_folder(
     # メタデータ
     metadata = load_metadata_for_folder(source_folder)
 
-    # ソースファイル収集（.txt と .md）
-    txt_files = list(folder_path.glob("*.txt"))
-    md_files = list(folder_path.glob("*.md"))
-    source_files = sorted(set(txt_files + md_files), key=natural_sort_key)
-
     if not source_files:
         raise EpubGenerationError(msg("no_commonmark_in_folder", folder=source_folder))
 
-    _validate_no_reserved_files(source_files)
     logger.info(msg("file_count_commonmark", count=len(source_files)))
 
     # 作業用フォルダ
     work_dir, textgrid_folder, audio_folder = _setup_work_directory()
 
     # 各ファイル処理
+    # アダプター生成は数式エントリーを共有するため常に本プロセスで行い、
+    # 並列実行時は音声生成のみをプロセスプールに渡す
+    parallel = _is_parallel_enabled(lang_config)
     adapters: list[CommonMarkSourceAdapter] = []
+    tasks: list[SourceTask] = []
     for src_file in source_files:
-        base_name = src_file.stem
-        logger.separator("=", 50)
-        logger.info(msg("processing_file", name=src_file.name))
+        _log_file_header(src_file)
 
         adapter = CommonMarkSourceAdapter(str(src_file))
         adapters.append(adapter)
 
-        work_txt = work_dir / f"{base_name}.txt"
-        work_wav = work_dir / f"{base_name}.wav"
-        work_mp3 = audio_folder / f"{base_name}.mp3"
-
-        generate_audio_with_textgrid(adapter, str(work_txt), str(work_wav), str(work_mp3), lang_config=lang_config)
+        task = _make_source_task(adapter, src_file.stem, work_dir, textgrid_folder, audio_folder, lang_config)
+        if parallel:
+            tasks.append(task)
+        else:
+            _process_one_source(task)
+            _align_one_source(task)
 
-        # TextGrid移動、WAV削除
-        tg_src = audio_folder / f"{base_name}.TextGrid"
-        if tg_src.exists():
-            shutil.move(tg_src, textgrid_folder / f"{base_name}.TextGrid")
-        if work_wav.exists():
-            work_wav.unlink()
+    if tasks:
+        _process_sources_parallel(tasks)
 
     # EPUB生成
     build_commonmark_multi_epub(
@@ -679,9 +902,11 @@ def _detect_math_in_source(source: str, input_format: InputFormat, is_folder: bo
     is_xml = input_format == InputFormat.XML
 
     if is_folder:
-        files = list(source_path.glob("*.xml")) if is_xml else (
-            list(source_path.glob("*.txt")) + list(source_path.glob("*.md"))
-        )
+        try:
+            files = _enumerate_sources(source_path, (".xml",) if is_xml else (".txt", ".md"))
+        except EpubGenerationError:
+            # フォルダの不備は本処理側で報告する
+            return False
     else:
         files = [source_path]
 
@@ -715,8 +940,8 @@ def _check_math_and_prompt(source: str, input_format: InputFormat, is_folder: bo
     print(msg("math_will_not_render"))
     logger.separator("-")
 
-    options = [msg("opt_abort_recommended"), msg("opt_continue_without_math")]
-    choice = _prompt_choice("", options, default=1)
+    options = (msg("opt_abort_recommended"), msg("opt_continue_without_math"))
+    choice = _prompt_yesno("", options, default=1)
     return choice == 2  # 2=続行, 1=中止
 
 
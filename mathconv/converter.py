@@ -8,6 +8,7 @@ import re
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable
 
 from core import logger
 
@@ -287,15 +288,25 @@ def mathml_to_speech_xml(mathml: str, sre_lang: str = "ja") -> str:
 # =============================================================================
 
 _current_processor: MathProcessor | None = None
+# MathProcessor の切り替え時に呼び出す関数（数式の読みに依存するキャッシュの破棄など）
+_processor_change_hooks: list[Callable[[], None]] = []
+
+
+def register_processor_change_hook(hook: Callable[[], None]) -> None:
+    """set_current_processor() で MathProcessor が切り替わるたびに呼び出す関数を登録する。"""
+    _processor_change_hooks.append(hook)
 
 
 def set_current_processor(proc: MathProcessor | None) -> None:
     """現在のMathProcessorをモジュールレベルで設定する。
 
     パイプライン開始時に呼び出し、処理全体で共有します。
+    設定後、register_processor_change_hook() で登録された関数を呼び出します。
     """
     global _current_processor
     _current_processor = proc
+    for hook in _processor_change_hooks:
+        hook()
 
 
 def get_current_processor() -> MathProcessor | None:
@@ -3,9 +3,11 @@ CommonMarkテキストの解析モジュール。
 
 見出し（#〜#####）の階層構造を解析し、セクションに分割します。
 """
+import os
 import re
+from collections.abc import Iterator
 from dataclasses import dataclass, field
-from pathlib import Path
+from functools import lru_cache
 
 from text.common import READING_SUB_PATTERN, strip_formatting, TextNormalizer, strip_formatting_for_display
 from text.processing import escape_with_formatting
@@ -14,6 +16,9 @@ from text.processing import escape_with_formatting
 # 見出しパターン: 行頭の#（1〜5個）+ 空白 + テキスト
 HEADING_PATTERN = re.compile(r'^(#{1,5})\s+(.+)$')
 
+# このサイズ未満のファイルは一括で読み込み、以上は1行ずつ読み進める
+READ_ALL_MAX_BYTES = 8 * 1024 * 1024
+
 
 @dataclass
 class HeadingInfo:
@@ -58,7 +63,11 @@ def extract_heading(line: str) -> tuple[int, str] | None:
     >>> extract_heading("Normal text")
     None
     """
-    match = HEADING_PATTERN.match(line.strip())
+    stripped = line.strip()
+    # 大半の行は見出しではないため、先頭文字の比較で正規表現を回避する
+    if stripped[:1] != '#':
+        return None
+    match = HEADING_PATTERN.match(stripped)
     if match:
         level = len(match.group(1))
         title = match.group(2).strip()
@@ -90,6 +99,25 @@ def process_title_for_xhtml(title: str) -> str:
     return escape_with_formatting(title)
 
 
+@lru_cache(maxsize=4096)
+def _format_title_cached(title: str) -> tuple[str, str]:
+    """_format_title のキャッシュ本体（数式を含まない見出しのみ）。"""
+    return process_title_for_xhtml(title), strip_formatting_for_display(title)
+
+
+def _format_title(title: str) -> tuple[str, str]:
+    """
+    見出しテキストを (XHTML, 表示用プレーンテキスト) に変換する。
+
+    「第N章」のように繰り返し現れる見出しは変換結果をキャッシュする。
+    数式プレースホルダー（\\x02MATH{idx}\\x02）を含む見出しは結果が
+    MathProcessorの状態に依存するため、キャッシュを使わない。
+    """
+    if '\x02' in title:
+        return process_title_for_xhtml(title), strip_formatting_for_display(title)
+    return _format_title_cached(title)
+
+
 def process_title_for_reading(title: str) -> str:
     """
     見出しテキストを読み上げ用に処理する。
@@ -110,7 +138,30 @@ def process_title_for_reading(title: str) -> str:
     return READING_SUB_PATTERN.sub(r'\2', title)
 
 
-def parse_commonmark(file_path: str) -> tuple[HeadingInfo | None, list[str]]:
+def _iter_lines(file_path: str, size: int) -> Iterator[str]:
+    """
+    ファイルの各行を改行文字を除いて返す。
+
+    小さいファイルは一括読み込み後に分割し、大きいファイルは1行ずつ読み進める。
+    splitlines() は \\x0c や \\u2028 などでも分割してしまうため、
+    1行ずつ読む場合と同じく改行（\\n, \\r\\n, \\r）でのみ分割する。
+    """
+    if size < READ_ALL_MAX_BYTES:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        lines = text.split('\n')
+        # 末尾の改行の後ろは行として扱わない
+        if lines[-1] == '':
+            lines.pop()
+        yield from lines
+        return
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for raw_line in f:
+            yield raw_line.rstrip('\n\r')
+
+
+def parse_commonmark(file_path: str) -> tuple[HeadingInfo | None, list[str] | None]:
     """
     CommonMarkファイルを解析して見出し階層構造を構築する。
 
@@ -121,44 +172,47 @@ def parse_commonmark(file_path: str) -> tuple[HeadingInfo | None, list[str]]:
 
     Returns
     -------
-    tuple[HeadingInfo | None, list[str]]
+    tuple[HeadingInfo | None, list[str] | None]
         - 見出し階層のルート（最初のh1見出し）。見出しがない場合はNone。
-        - ファイル内の全行リスト。
+        - ファイル内の全行リスト。見出しがない場合のみ返し、見出しがある場合はNone
+          （見出しがない場合は本文として必要になるため）。
 
     Notes
     -----
     見出しの階層構造を構築し、各見出しの配下にある段落を
     content属性に格納します。
+    最初の見出しが現れた時点で全行リストの保持をやめます。
     """
-    if not Path(file_path).exists():
+    try:
+        size = os.stat(file_path).st_size
+    except FileNotFoundError:
         raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = [line.rstrip('\n\r') for line in f]
-
-    if not lines:
-        return None, []
-
     # 見出しと段落を解析
     headings: list[HeadingInfo] = []
     current_heading: HeadingInfo | None = None
+    lines: list[str] | None = []
 
     # 数式プレースホルダー置換（MathProcessorが設定されている場合）
     from mathconv.converter import get_current_processor
     math_proc = get_current_processor()
 
-    for line in lines:
+    for line in _iter_lines(file_path, size):
+        if lines is not None:
+            lines.append(line)
+
         heading_info = extract_heading(line)
 
         if heading_info:
+            # 見出しがあれば全行リストは不要
+            lines = None
             level, title = heading_info
             # 数式を含む見出しのプレースホルダー置換
             if math_proc:
                 title = math_proc.substitute(title)
             # title_xhtml: 書式タグ付きXHTML（h1-h5およびnav用）
-            title_xhtml = process_title_for_xhtml(title)
             # title_plain: プレーンテキスト（書式除去、内部使用・読み上げ用）
-            title_plain = strip_formatting_for_display(title)
+            title_xhtml, title_plain = _format_title(title)
 
             new_heading = HeadingInfo(
                 level=level,
@@ -242,21 +296,19 @@ def split_into_sections(root: HeadingInfo) -> list[Section]:
     sections: list[Section] = []
     chapter_num = 1
 
-    def _traverse(heading: HeadingInfo) -> None:
-        nonlocal chapter_num
-
-        section = Section(
+    # 明示的なスタックで先行順に走査（深い入れ子でも再帰しない）
+    # 段落リストは下流で読み取り専用のため、コピーせず共有する
+    stack: list[HeadingInfo] = [root]
+    while stack:
+        heading = stack.pop()
+        sections.append(Section(
             id=f"chapter{chapter_num}",
             heading=heading,
-            paragraphs=heading.content.copy()
-        )
-        sections.append(section)
+            paragraphs=heading.content
+        ))
         chapter_num += 1
+        stack.extend(reversed(heading.children))
 
-        for child in heading.children:
-            _traverse(child)
-
-    _traverse(root)
     return sections
 
 
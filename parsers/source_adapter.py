@@ -4,6 +4,8 @@
 入力形式に依存しない統一的なインターフェースを提供します。
 """
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from itertools import chain, islice
 from typing import TYPE_CHECKING
 
 from text.common import create_reading_file, strip_formatting_for_display
@@ -14,6 +16,13 @@ if TYPE_CHECKING:
     from parsers.xml_converter import XmlSection
 
 
+def _iter_section_paragraphs(sections: Iterable["Section"]) -> Iterator[str]:
+    """各セクションの見出し（読み上げ用）と段落を順に返す。"""
+    for section in sections:
+        yield section.heading.title
+        yield from section.paragraphs
+
+
 class SourceAdapter(ABC):
     """入力ソースの抽象基底クラス。"""
 
@@ -107,10 +116,9 @@ class XMLSourceAdapter(SourceAdapter):
             self._title = self._sections[0].title_text
             self._title_xhtml = self._sections[0].title_xhtml or self._sections[0].title_text
             # 全paragraphsフラット化（音声生成用）
-            all_paras: list[str] = []
-            for sec in self._sections:
-                all_paras.extend(sec.paragraphs_xhtml)
-            self._paragraphs = all_paras
+            self._paragraphs = list(chain.from_iterable(
+                sec.paragraphs_xhtml for sec in self._sections
+            ))
 
     def generate_reading_text(self, output_path: str) -> None:
         """XMLからXSLT変換で読み上げテキストを生成する。"""
@@ -142,6 +150,7 @@ class CommonMarkSourceAdapter(SourceAdapter):
         self._root_heading: "HeadingInfo | None" = None
         self._no_headings: bool = False
         self._all_lines: list[str] = []
+        self._body_cache: list[str] | None = None
         super().__init__(file_path)
 
     def has_headings(self) -> bool:
@@ -156,21 +165,15 @@ class CommonMarkSourceAdapter(SourceAdapter):
         """CommonMark拡張ファイルをパースする。"""
         from parsers.commonmark import parse_commonmark, split_into_sections
 
-        self._root_heading, self._all_lines = parse_commonmark(self.file_path)
+        self._root_heading, all_lines = parse_commonmark(self.file_path)
+        self._all_lines = all_lines or []
 
         if self._root_heading:
             # 見出しがある場合: 見出しで分割
             self._sections = split_into_sections(self._root_heading)
             self._title = self._root_heading.title
             self._title_xhtml = self._root_heading.title_xhtml
-
-            # _paragraphs は全セクションの全段落（音声生成時に使用）
-            all_paragraphs: list[str] = []
-            for section in self._sections:
-                # 見出しも段落として追加（読み上げ用）
-                all_paragraphs.append(section.heading.title)
-                all_paragraphs.extend(section.paragraphs)
-            self._paragraphs = all_paragraphs
+            # 全段落のフラットなリストは get_paragraphs() で初めて必要になった時に作る
         else:
             # 見出しがない場合: 1行目をタイトルとして扱う
             paragraphs = [line for line in self._all_lines if line.strip()]
@@ -197,8 +200,25 @@ class CommonMarkSourceAdapter(SourceAdapter):
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(reading_text)
 
+    def get_paragraphs(self) -> list[str]:
+        """
+        本文段落を取得する（XHTML形式）。
+
+        見出しがある場合は全セクションの見出しと全段落を初回呼び出し時に
+        _sections から組み立て、以降は同じリストを返す。
+        """
+        if self._paragraphs is None and self._sections:
+            self._paragraphs = list(_iter_section_paragraphs(self._sections))
+        return self._paragraphs or []
+
     def get_body_paragraphs(self) -> list[str]:
-        """タイトルを除いた本文段落を返す。"""
+        """タイトルを除いた本文段落を返す（初回呼び出し時に組み立てて保持する）。"""
+        if self._body_cache is None:
+            self._body_cache = self._build_body_paragraphs()
+        return self._body_cache
+
+    def _build_body_paragraphs(self) -> list[str]:
+        """get_body_paragraphs() の本体。"""
         if self._no_headings:
             # 見出しがない場合: 1行目を除いた残りを返す
             if self._paragraphs and len(self._paragraphs) > 1:
@@ -208,17 +228,12 @@ class CommonMarkSourceAdapter(SourceAdapter):
         if not self._sections:
             return []
 
-        # 見出しがある場合: 最初のセクションの見出しを除き、残りの段落をすべて返す
-        body_paragraphs: list[str] = []
-        for i, section in enumerate(self._sections):
-            if i == 0:
-                # 最初のセクションは本文のみ（見出しはタイトルとして別途使用）
-                body_paragraphs.extend(section.paragraphs)
-            else:
-                # 2番目以降は見出しも含める
-                body_paragraphs.append(section.heading.title)
-                body_paragraphs.extend(section.paragraphs)
-        return body_paragraphs
+        # 見出しがある場合: 最初のセクションは本文のみ（見出しはタイトルとして別途使用）、
+        # 2番目以降は見出しも含めて返す
+        return list(chain(
+            self._sections[0].paragraphs,
+            _iter_section_paragraphs(islice(self._sections, 1, None)),
+        ))
 
     def get_sections(self) -> list["Section"]:
         """セクションリストを取得する。"""
@@ -3,19 +3,40 @@ XMLファイルからaudio.txt（読み上げ用テキスト）およびXHTMLコ
 
 XSLT 3.0 プロセッサ（saxonche）を使用してXML変換を行います。
 """
+import atexit
+import os
 import re
+import tempfile
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
-from saxonche import PySaxonProcessor
+from typing import TYPE_CHECKING
 
-from text.common import TextNormalizer
+from text.common import MATHML_PATTERN, TextNormalizer
 from core.config import PUNCTUATION_CHARS
 
+if TYPE_CHECKING:
+    from saxonche import PySaxonProcessor
+
 # XSLTファイルのパス（resourcesディレクトリに配置）
 PROJECT_ROOT = Path(__file__).parent.parent
 XSLT_AUDIO_TXT = PROJECT_ROOT / "resources" / "xml_to_audio_txt.xsl"
 XSLT_XHTML = PROJECT_ROOT / "resources" / "xml_to_xhtml.xsl"
 XSLT_SPLIT = PROJECT_ROOT / "resources" / "xml_split_at_delimiters.xsl"
+# compile_stylesheet に渡す文字列パス（コンパイルのたびに変換しない）
+XSLT_AUDIO_TXT_STR = str(XSLT_AUDIO_TXT)
+XSLT_XHTML_STR = str(XSLT_XHTML)
+XSLT_SPLIT_STR = str(XSLT_SPLIT)
+
+# 文の区切り文字にマッチする正規表現（xml_split_at_delimiters.xsl に渡す）
+_DELIMITER_REGEX = f"[{PUNCTUATION_CHARS}]"
+
+# XSLT出力のセクション: <section level="N">...</section>
+_SECTION_PATTERN = re.compile(r'<section\s+level="(\d+)">(.*?)</section>', re.DOTALL)
+# セクション内の要素（それぞれ独立に検索する。heading 内の p や heading-text も対象）
+_HEADING_PATTERN = re.compile(r'<heading>(.*?)</heading>', re.DOTALL)
+_HEADING_TEXT_PATTERN = re.compile(r'<heading-text>(.*?)</heading-text>', re.DOTALL)
+_PARAGRAPH_PATTERN = re.compile(r'<p>(.*?)</p>', re.DOTALL)
 
 
 @dataclass
@@ -27,6 +48,63 @@ class XmlSection:
     paragraphs_xhtml: list[str] = field(default_factory=list)  # 本文段落XHTML
 
 
+@dataclass
+class _XsltExecutables:
+    """コンパイル済みXSLTスタイルシート一式（プロセス内で使い回す）。"""
+    proc: "PySaxonProcessor"
+    audio_txt: object                     # xml_to_audio_txt.xsl
+    split: object                         # xml_split_at_delimiters.xsl（区切り文字パラメータ設定済み）
+    xhtml: object                         # xml_to_xhtml.xsl
+
+
+# get_sections_from_xml の結果キャッシュ（古いものから破棄）
+# キー: (絶対パス, 更新時刻[ns], サイズ, SRE言語)。数式の読みはSRE言語のみに依存する
+_SECTIONS_CACHE_MAX = 64
+_sections_cache: dict[tuple[str, int, int, str | None], list[XmlSection]] = {}
+_sections_cache_lock = threading.Lock()
+
+_executables: _XsltExecutables | None = None
+# 初期化と変換の両方を保護する（SaxonCの実行オブジェクトはスレッド間での
+# 同時使用が保証されていないため、変換も直列化する）
+_xslt_lock = threading.RLock()
+
+
+def _get_executables() -> _XsltExecutables:
+    """
+    XSLTプロセッサとコンパイル済みスタイルシートを返す。
+
+    初回呼び出し時にプロセッサを生成して3つのスタイルシートをコンパイルし、
+    以降はプロセス終了まで同じものを返す。変換中は呼び出し側で _xslt_lock を保持すること。
+    """
+    global _executables
+    with _xslt_lock:
+        if _executables is None:
+            # saxonche はXSLT変換を行う時に初めて読み込む（セクション抽出等はsaxoncheなしで使える）
+            from saxonche import PySaxonProcessor
+            proc = PySaxonProcessor(license=False)
+            xslt_proc = proc.new_xslt30_processor()
+
+            split_exec = xslt_proc.compile_stylesheet(stylesheet_file=XSLT_SPLIT_STR)
+            split_exec.set_parameter("delimiter-pattern",
+                                     proc.make_string_value(_DELIMITER_REGEX))
+
+            _executables = _XsltExecutables(
+                proc=proc,
+                audio_txt=xslt_proc.compile_stylesheet(stylesheet_file=XSLT_AUDIO_TXT_STR),
+                split=split_exec,
+                xhtml=xslt_proc.compile_stylesheet(stylesheet_file=XSLT_XHTML_STR),
+            )
+            atexit.register(_release_executables)
+        return _executables
+
+
+def _release_executables() -> None:
+    """キャッシュしたXSLTプロセッサを破棄する（プロセス終了時）。"""
+    global _executables
+    with _xslt_lock:
+        _executables = None
+
+
 def _add_sre_speech_to_math(xml_text: str, sre_lang: str) -> str:
     """XMLテキスト内の<math>要素にsre-speech属性を追加する（XHTML変換用）。
 
@@ -59,7 +137,7 @@ def _add_sre_speech_to_math(xml_text: str, sre_lang: str) -> str:
         # 開始タグの閉じ > の直前に sre-speech 属性を挿入
         return _re.sub(r'(<math\b[^>]*)(>)', rf'\1 sre-speech="{speech_escaped}"\2', mathml, count=1)
 
-    return _re.sub(r'<math\b[^>]*>.*?</math>', add_speech_attr, xml_text, flags=_re.DOTALL)
+    return MATHML_PATTERN.sub(add_speech_attr, xml_text)
 
 
 def _replace_math_with_yomikae(xml_text: str, sre_lang: str) -> str:
@@ -94,7 +172,7 @@ def _replace_math_with_yomikae(xml_text: str, sre_lang: str) -> str:
                           .replace('"', '&quot;'))
         return f'<yomikae yomi="{speech_escaped}">数式</yomikae>'
 
-    return _re.sub(r'<math\b[^>]*>.*?</math>', replace_math, xml_text, flags=_re.DOTALL)
+    return MATHML_PATTERN.sub(replace_math, xml_text)
 
 
 def convert_xml_to_audio_txt(xml_path: str, output_path: str) -> None:
@@ -127,17 +205,22 @@ def convert_xml_to_audio_txt(xml_path: str, output_path: str) -> None:
     sre_lang = math_proc.sre_lang if math_proc else "ja"
     xml_text = _replace_math_with_yomikae(xml_text, sre_lang)
 
-    with PySaxonProcessor(license=False) as proc:
-        xslt_proc = proc.new_xslt30_processor()
-        executable = xslt_proc.compile_stylesheet(stylesheet_file=str(XSLT_AUDIO_TXT))
-        xdm_node = proc.parse_xml(xml_text=xml_text)
-        result = executable.transform_to_string(xdm_node=xdm_node)
-
-        # 特殊文字を読み仮名に変換（MFAアライメント用）
-        result = TextNormalizer.to_reading(result)
+    # 変換結果はSaxonに一時ファイルへ直接書き出させ、Python側で結果全体の文字列を持たない
+    fd, tmp_path = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+    try:
+        with _xslt_lock:
+            xslt = _get_executables()
+            xdm_node = xslt.proc.parse_xml(xml_text=xml_text)
+            xslt.audio_txt.transform_to_file(xdm_node=xdm_node, output_file=tmp_path)
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(result)
+        # 特殊文字を読み仮名に変換（MFAアライメント用、文字単位の変換なので行ごとに処理できる）
+        with open(tmp_path, "r", encoding="utf-8", newline="") as fin, \
+                open(output_path, "w", encoding="utf-8") as fout:
+            for line in fin:
+                fout.write(TextNormalizer.to_reading(line))
+    finally:
+        os.remove(tmp_path)
 
 
 def get_sections_from_xml(xml_path: str) -> list[XmlSection]:
@@ -153,31 +236,58 @@ def get_sections_from_xml(xml_path: str) -> list[XmlSection]:
     -------
     list[XmlSection]
         セクション情報のリスト。
+
+    Notes
+    -----
+    XSLT変換結果は (パス, 更新時刻, サイズ, SRE言語) ごとにキャッシュする。
+    ファイルが更新されればキーが変わるため再変換される。
+    返り値はキャッシュのコピーなので、呼び出し側で変更してよい。
     """
     from mathconv.converter import get_current_processor
 
+    math_proc = get_current_processor()
+    sre_lang = math_proc.sre_lang if math_proc else None
+    st = os.stat(xml_path)
+    key = (os.path.abspath(xml_path), st.st_mtime_ns, st.st_size, sre_lang)
+
+    with _sections_cache_lock:
+        sections = _sections_cache.get(key)
+    if sections is None:
+        sections = _transform_sections(xml_path, sre_lang)
+        with _sections_cache_lock:
+            if len(_sections_cache) >= _SECTIONS_CACHE_MAX:
+                del _sections_cache[next(iter(_sections_cache))]
+            _sections_cache[key] = sections
+
+    return [
+        XmlSection(
+            level=sec.level,
+            title_text=sec.title_text,
+            title_xhtml=sec.title_xhtml,
+            paragraphs_xhtml=list(sec.paragraphs_xhtml)
+        )
+        for sec in sections
+    ]
+
+
+def _transform_sections(xml_path: str, sre_lang: str | None) -> list[XmlSection]:
+    """XMLファイルをXSLTで変換してセクションリストを得る（キャッシュなし）。"""
     with open(xml_path, 'r', encoding='utf-8') as f:
         xml_text = f.read()
 
     # math要素にsre-speech属性を追加（XSLTでdata-yomiとして伝達、マッチング用）
-    math_proc = get_current_processor()
-    if math_proc:
-        xml_text = _add_sre_speech_to_math(xml_text, math_proc.sre_lang)
+    if sre_lang is not None:
+        xml_text = _add_sre_speech_to_math(xml_text, sre_lang)
 
-    with PySaxonProcessor(license=False) as proc:
-        xslt_proc = proc.new_xslt30_processor()
+    with _xslt_lock:
+        xslt = _get_executables()
 
         # Step 1: 句読点で分割する前処理
-        split_exec = xslt_proc.compile_stylesheet(stylesheet_file=str(XSLT_SPLIT))
-        delimiter_regex = f"[{PUNCTUATION_CHARS}]"
-        split_exec.set_parameter("delimiter-pattern",
-                                 proc.make_string_value(delimiter_regex))
-        split_result = split_exec.transform_to_string(xdm_node=proc.parse_xml(xml_text=xml_text))
+        split_result = xslt.split.transform_to_string(xdm_node=xslt.proc.parse_xml(xml_text=xml_text))
 
         # Step 2: 前処理済みXMLからXHTML変換
-        xhtml_exec = xslt_proc.compile_stylesheet(stylesheet_file=str(XSLT_XHTML))
-        split_node = proc.parse_xml(xml_text=split_result)
-        result = xhtml_exec.transform_to_string(xdm_node=split_node)
+        split_node = xslt.proc.parse_xml(xml_text=split_result)
+        result = xslt.xhtml.transform_to_string(xdm_node=split_node)
 
     return _extract_sections(result)
 
@@ -238,20 +348,19 @@ def _extract_sections(xml_str: str) -> list[XmlSection]:
     sections: list[XmlSection] = []
 
     # <section level="N">...</section> をイテレート
-    section_pattern = r'<section\s+level="(\d+)">(.*?)</section>'
-    for match in re.finditer(section_pattern, xml_str, re.DOTALL):
+    for match in _SECTION_PATTERN.finditer(xml_str):
         level = int(match.group(1))
         content = match.group(2)
 
         # <heading>...</heading> を抽出
-        title_xhtml = _extract_content(content, "heading")
+        title_xhtml = _extract_content(content, _HEADING_PATTERN)
 
         # <heading-text>...</heading-text> を抽出
-        heading_text_xhtml = _extract_content(content, "heading-text")
+        heading_text_xhtml = _extract_content(content, _HEADING_TEXT_PATTERN)
         title_text = _strip_xhtml_tags(heading_text_xhtml) if heading_text_xhtml else _strip_xhtml_tags(title_xhtml)
 
-        # <p>...</p> を抽出
-        paragraphs = _extract_paragraphs(content)
+        # <p>...</p> を抽出（heading 内にあるものも含む）
+        paragraphs = [m.strip() for m in _PARAGRAPH_PATTERN.findall(content)]
 
         sections.append(XmlSection(
             level=level,
@@ -263,27 +372,64 @@ def _extract_sections(xml_str: str) -> list[XmlSection]:
     return sections
 
 
-def _extract_content(xml_str: str, tag_name: str) -> str:
-    """XMLから指定タグの内容を抽出する。"""
-    pattern = rf"<{tag_name}>(.*?)</{tag_name}>"
-    match = re.search(pattern, xml_str, re.DOTALL)
+def _extract_content(xml_str: str, pattern: re.Pattern) -> str:
+    """XMLから指定タグ（コンパイル済みパターン）の最初の内容を抽出する。"""
+    match = pattern.search(xml_str)
     return match.group(1).strip() if match else ""
 
 
-def _extract_paragraphs(xml_str: str) -> list[str]:
-    """XMLからすべてのp要素の内容をリストで抽出する。"""
-    pattern = r"<p>(.*?)</p>"
-    matches = re.findall(pattern, xml_str, re.DOTALL)
-    return [m.strip() for m in matches]
-
-
 def _strip_xhtml_tags(xhtml: str) -> str:
-    """XHTMLタグを除去してプレーンテキストを返す。"""
-    # ruby要素からルビテキスト（rt内容）を除去し、親字のみ残す
-    result = re.sub(r"<ruby><rb>(.*?)</rb><rt>.*?</rt></ruby>", r"\1", xhtml)
-    # その他すべてのタグを除去
-    result = re.sub(r"<[^>]+>", "", result)
-    return result
+    """
+    XHTMLタグを除去してプレーンテキストを返す。
+
+    先頭から1回走査し、タグはすべて取り除いて内容だけを残す。
+    ただし ruby 要素内の rt 要素（ルビテキスト）は内容ごと除去し、ruby は親字のみ残す。
+    rt の閉じタグがなければ </ruby> の手前まで除去し、どちらもなければ除去しない。
+    ruby の外にある rt はタグのみ除去する。
+    """
+    if '<' not in xhtml:
+        return xhtml
+
+    buf: list[str] = []
+    pos = 0
+    length = len(xhtml)
+    ruby_depth = 0
+    while pos < length:
+        lt = xhtml.find('<', pos)
+        if lt < 0:
+            buf.append(xhtml[pos:])
+            break
+        gt = xhtml.find('>', lt + 1)
+        if gt < 0 or gt == lt + 1:
+            # 閉じていない "<" や空の "<>" はタグではないためそのまま残す
+            buf.append(xhtml[pos:lt + 1])
+            pos = lt + 1
+            continue
+        buf.append(xhtml[pos:lt])
+        pos = gt + 1
+
+        tag = xhtml[lt + 1:gt]
+        if tag[-1] == '/':
+            # 空要素タグ
+            continue
+        if tag[0] == '/':
+            if tag == '/ruby' and ruby_depth:
+                ruby_depth -= 1
+            continue
+
+        name = tag.split(None, 1)[0] if not tag[0].isspace() else ""
+        if name == "ruby":
+            ruby_depth += 1
+        elif name == "rt" and ruby_depth:
+            # </rt> まで読み飛ばす（なければ </ruby> の手前まで）
+            rt_end = xhtml.find('</rt>', pos)
+            ruby_end = xhtml.find('</ruby>', pos)
+            if rt_end >= 0 and (ruby_end < 0 or rt_end < ruby_end):
+                pos = rt_end + len('</rt>')
+            elif ruby_end >= 0:
+                pos = ruby_end
+
+    return "".join(buf)
 
 
 def is_xml_file(file_path: str) -> bool:
@@ -0,0 +1,13 @@
+"""
+テスト共通設定。
+
+リポジトリのルートをインポートパスに追加し、main や各パッケージを
+テストから（プロセスプールのワーカーからも）インポートできるようにする。
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
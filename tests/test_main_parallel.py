@@ -0,0 +1,94 @@
+"""
+フォルダ処理の並列実行（main._process_one_source）のテスト。
+
+実際のプロセスプール（spawn）でタスクを実行し、SourceAdapter と MathProcessor が
+pickle を経由してワーカーに引き継がれること、ワーカーではMFAを実行しないことを確認する。
+TTSとMP3変換はワーカーの初期化時に差し替える。
+"""
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+import main
+from core.config import get_language_config
+from mathconv.converter import MathProcessor, get_current_processor
+from parsers.source_adapter import CommonMarkSourceAdapter
+
+
+def _fake_generate_audio(text_path: str, wav_path: str, lang_config) -> None:
+    """TTSの代わりに、ワーカーで有効な数式言語と読み上げテキストを書き出す。"""
+    math_proc = get_current_processor()
+    sre_lang = math_proc.sre_lang if math_proc else ""
+    text = Path(text_path).read_text(encoding="utf-8")
+    Path(wav_path).write_text(f"{sre_lang}\n{text}", encoding="utf-8")
+
+
+def _fake_convert_wav_to_mp3(wav_path: str, mp3_path: str) -> None:
+    """FFmpegの代わりにWAVをそのままコピーする。"""
+    shutil.copyfile(wav_path, mp3_path)
+
+
+def _stub_audio_tools() -> None:
+    """ワーカーの初期化: 外部ツールを使う音声処理を差し替える。"""
+    import audio.pipeline as pipeline
+    pipeline.generate_audio = _fake_generate_audio
+    pipeline.convert_wav_to_mp3 = _fake_convert_wav_to_mp3
+
+
+def test_process_one_source_in_spawned_process_pool(tmp_path: Path) -> None:
+    work_dir = tmp_path / "work_multi"
+    textgrid_folder = work_dir / "textgrid"
+    audio_folder = work_dir / "audio"
+    for folder in (textgrid_folder, audio_folder):
+        folder.mkdir(parents=True)
+
+    lang_config = get_language_config("en_US")
+    math_proc = MathProcessor(sre_lang="en")
+    tasks = []
+    for i in range(2):
+        src_file = tmp_path / f"chapter{i}.txt"
+        src_file.write_text(f"# Chapter {i}\n\nParagraph {i}.\n", encoding="utf-8")
+        adapter = CommonMarkSourceAdapter(str(src_file))
+        task = main._make_source_task(
+            adapter, src_file.stem, work_dir, textgrid_folder, audio_folder, lang_config
+        )
+        task.math_proc = math_proc
+        tasks.append(task)
+
+    with ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_stub_audio_tools,
+    ) as executor:
+        results = list(executor.map(main._process_one_source, tasks))
+
+    assert results == [None, None]
+    for i, task in enumerate(tasks):
+        # 読み上げテキストとMP3はワーカーで生成され、数式の設定も引き継がれている
+        assert f"Paragraph {i}." in task.work_txt.read_text(encoding="utf-8")
+        mp3_text = task.work_mp3.read_text(encoding="utf-8")
+        assert mp3_text.startswith("en\n")
+        assert f"Paragraph {i}." in mp3_text
+        # WAVは削除され、TextGrid（MFA）はワーカーでは生成されない
+        assert not task.work_wav.exists()
+        assert not task.textgrid_dst.exists()
+        assert not task.work_mp3.with_suffix(".TextGrid").exists()
+
+
+def test_parallel_worker_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(os, "cpu_count", lambda: 16)
+
+    monkeypatch.delenv(main.PARALLEL_WORKERS_ENV_VAR, raising=False)
+    assert main._parallel_worker_count(10) == main.DEFAULT_PARALLEL_WORKERS
+
+    monkeypatch.setenv(main.PARALLEL_WORKERS_ENV_VAR, "3")
+    assert main._parallel_worker_count(10) == 3
+    assert main._parallel_worker_count(1) == 1
+
+    for invalid in ("0", "-1", "many"):
+        monkeypatch.setenv(main.PARALLEL_WORKERS_ENV_VAR, invalid)
+        assert main._parallel_worker_count(10) == main.DEFAULT_PARALLEL_WORKERS
@@ -0,0 +1,130 @@
+"""
+テキスト処理モジュール（text.processing）のテスト。
+
+読み位置→元テキスト位置の変換（TextGridの位置合わせで使う）を表で確認する。
+期待値は、逐次走査による以前の実装での変換結果。
+"""
+import pytest
+
+from mathconv.converter import MathEntry, MathProcessor, set_current_processor
+from text.processing import _tokenize, get_original_range, reading_pos_to_original
+
+# (元テキスト, 読み位置 0, 1, 2, ... に対応する元テキストでの位置)
+_READING_POS_CASES = [
+    ('あいう', [0, 1, 2, 3, 3]),
+    ('[漢字](-かんじ)です', [0, 0, 0, 10, 11, 12, 12]),
+    ('[表](+ひょう)と裏', [0, 0, 0, 9, 10, 11, 11]),
+    ('[下線]{.underline}の語', [1, 2, 16, 17, 18, 18]),
+    ('[枠]{.frame}付き', [1, 11, 12, 13, 13]),
+    ('**強調**です', [2, 3, 6, 7, 8, 8]),
+    ('H~2~O', [0, 2, 4, 5, 5]),
+    ('x^2^+1', [0, 2, 4, 5, 6, 6]),
+    ('![図の説明](fig.png)後', [0, 16, 16, 16, 16, 17, 17]),
+    # 入れ子の書式記法
+    ('**[f g]{.frame}**', [3, 4, 5, 17, 17]),
+    ('~ⓓ~[関係]{.frame}', [1, 1, 1, 4, 5, 15, 15]),
+    ('[**太字**と下線]{.underline}', [3, 4, 7, 8, 9, 23, 23]),
+    ('**[あ](-い)**', [2, 11, 11]),
+    ('[外[内]{.frame}外]{.underline}', [1, 3, 13, 27, 27]),
+    # 書式記法を挟む通常の文字の並び
+    ('abcdefghij klmnop', [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 17]),
+    ('長い平文の並びの後に[語](-ご)', [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 17, 17, 17, 17]),
+    ('平文**強**平文', [0, 1, 4, 7, 8, 9, 9, 9]),
+    # READING_MAP文字（1文字が複数文字の読みに展開される）
+    ('①と②', [0, 0, 1, 2, 3, 3]),
+    ('Ⅱ章ⓐ', [0, 1, 2, 2, 3, 3]),
+    ('[①]{.underline}後', [1, 1, 15, 16, 16]),
+    ('（１）〜（２）', [0, 1, 1, 2, 3, 3, 4, 5, 6, 7, 7]),
+    # 閉じていない書式記法は通常の文字として扱う
+    ('[あ](-い', [0, 1, 2, 3, 4, 5, 6, 6]),
+    ('**未完', [0, 1, 2, 3, 4, 4]),
+    ('a~b', [0, 1, 2, 3, 3]),
+]
+
+# (元テキスト, 読み開始位置, 読みの長さ, 元テキストでの範囲)
+_ORIGINAL_RANGE_CASES = [
+    ('[首都](-しゅと)直下', 0, 3, (0, 10)),
+    ('[首都](-しゅと)直下', 3, 2, (10, 12)),
+    ('[漢字](-かんじ)です', 3, 2, (10, 12)),
+    ('[表](+ひょう)と裏', 0, 3, (0, 9)),
+    ('[下線]{.underline}の語', 2, 2, (16, 18)),
+    ('前[枠]{.frame}後', 0, 3, (0, 13)),
+    ('前[枠]{.frame}後', 1, 1, (1, 12)),
+    ('**強調**です', 0, 4, (0, 8)),
+    ('H~2~O', 1, 1, (1, 4)),
+    ('**[f g]{.frame}**', 0, 3, (0, 17)),
+    ('[**太字**と下線]{.underline}', 0, 2, (1, 7)),
+    ('[**太字**と下線]{.underline}', 3, 2, (8, 10)),
+    ('![図の説明](fig.png)後', 0, 5, (0, 17)),
+    ('abcdefghij klmnop', 3, 5, (3, 8)),
+    ('①と②', 0, 3, (0, 2)),
+    ('Ⅱ章ⓐ', 1, 3, (1, 3)),
+    ('長い平文の並びの後に[語](-ご)', 8, 3, (8, 17)),
+    ('あいう', 1, 0, (1, 1)),
+]
+
+# (元テキスト, 数式 MATH0 の読み, 読み位置 0, 1, 2, ... に対応する元テキストでの位置)
+_MATH_READING_POS_CASES = [
+    ('前\x02MATH0\x02後', 'えっくす', [0, 1, 8, 8, 8, 8, 9, 9]),
+    ('前\x02MATH0\x02後', 'わい', [0, 1, 8, 8, 9, 9]),
+    # 対応するエントリがないプレースホルダーは通常の文字として扱う
+    ('\x02MATH1\x02', 'えっくす', [0, 1, 2, 3, 4, 5, 6, 7, 7]),
+]
+
+
+def _processor_with_speech(speech: str) -> MathProcessor:
+    """読み上げテキストが speech の数式を1つ持つ MathProcessor を作る（pandoc・SREは使わない）。"""
+    proc = MathProcessor("ja")
+    proc._entries.append(MathEntry(mathml='<math/>', speech=speech, display=False))
+    return proc
+
+
+@pytest.fixture
+def use_processor():
+    """テスト中だけ MathProcessor を設定し、終了時に解除する。"""
+    yield set_current_processor
+    set_current_processor(None)
+
+
+@pytest.mark.parametrize("text, expected", _READING_POS_CASES)
+def test_reading_pos_to_original(text: str, expected: list[int]) -> None:
+    assert [reading_pos_to_original(text, pos) for pos in range(len(expected))] == expected
+
+
+@pytest.mark.parametrize("text, reading_start, reading_len, expected", _ORIGINAL_RANGE_CASES)
+def test_get_original_range(
+        text: str, reading_start: int, reading_len: int, expected: tuple[int, int]
+) -> None:
+    assert get_original_range(text, reading_start, reading_len) == expected
+
+
+@pytest.mark.parametrize("text, speech, expected", _MATH_READING_POS_CASES)
+def test_reading_pos_to_original_with_math(
+        use_processor, text: str, speech: str, expected: list[int]
+) -> None:
+    use_processor(_processor_with_speech(speech))
+
+    assert [reading_pos_to_original(text, pos) for pos in range(len(expected))] == expected
+
+
+def test_reading_pos_follows_processor_switch(use_processor) -> None:
+    # "前" + プレースホルダー（7文字） + "後"
+    text = '前\x02MATH0\x02後'
+    use_processor(_processor_with_speech('えっくす'))
+    assert reading_pos_to_original(text, 5) == 8
+    assert get_original_range(text, 1, 4) == (1, 8)
+
+    # 別の MathProcessor に切り替えると、数式の読みの長さも切り替わる
+    use_processor(_processor_with_speech('わい'))
+    assert reading_pos_to_original(text, 3) == 8
+    assert get_original_range(text, 1, 2) == (1, 8)
+
+
+def test_set_current_processor_clears_tokenize_cache(use_processor) -> None:
+    use_processor(_processor_with_speech('えっくす'))
+    reading_pos_to_original('前\x02MATH0\x02後', 5)
+    assert _tokenize.cache_info().currsize > 0
+
+    # 切り替え後は以前の MathProcessor をキーにした分割結果を保持しない
+    use_processor(None)
+    assert _tokenize.cache_info().currsize == 0
@@ -0,0 +1,27 @@
+"""
+XHTMLテキスト処理モジュール（text.xhtml）のテスト。
+
+XHTMLの読み位置→元テキスト位置の変換を表で確認する。
+期待値は、逐次走査による以前の実装での変換結果。
+"""
+import pytest
+
+from text.xhtml import xhtml_reading_pos_to_original
+
+# (XHTML, 読み位置 0, 1, 2, ... に対応するXHTMLでの位置)
+_XHTML_READING_POS_CASES = [
+    ('<u>下線</u>の語', [0, 4, 9, 10, 11, 11]),
+    ('<ruby><rb>親</rb><rt>おや</rt></ruby>子', [0, 0, 34, 35, 35]),
+    ('<span data-yomi="よみ">表</span>記', [0, 0, 29, 30, 30]),
+    ('<strong>強</strong><br/>次', [0, 18, 24, 24]),
+    ('a<sub>2</sub>b', [0, 1, 13, 14, 14]),
+    ('前<em>x</em>後', [0, 1, 11, 12, 12]),
+    # タグを挟む通常の文字の並び
+    ('平文の並び<u>下線</u>平文の並び', [0, 1, 2, 3, 4, 5, 9, 14, 15, 16, 17, 18, 19, 19]),
+    ('ab<br/>cdefgh<em>i</em>jk', [0, 1, 2, 8, 9, 10, 11, 12, 13, 23, 24, 25, 25, 25]),
+]
+
+
+@pytest.mark.parametrize("xhtml, expected", _XHTML_READING_POS_CASES)
+def test_xhtml_reading_pos_to_original(xhtml: str, expected: list[int]) -> None:
+    assert [xhtml_reading_pos_to_original(xhtml, pos) for pos in range(len(expected))] == expected
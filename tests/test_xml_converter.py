@@ -0,0 +1,64 @@
+"""
+XML変換モジュール（parsers.xml_converter）のテスト。
+
+XSLT変換の結果を扱う部分（セクション抽出・タグ除去）を、saxoncheを使わずに確認する。
+"""
+from parsers.xml_converter import _extract_sections, _strip_xhtml_tags
+
+
+def test_extract_sections_collects_heading_text_and_paragraphs() -> None:
+    xml_str = (
+        '<result>'
+        '<section level="1"><heading><span>第1章</span></heading>'
+        '<heading-text>第1章</heading-text><p> 本文1 </p><p>本文2</p></section>'
+        '<section level="0"><p>前書き</p></section>'
+        '</result>'
+    )
+
+    sections = _extract_sections(xml_str)
+
+    assert [s.level for s in sections] == [1, 0]
+    assert sections[0].title_xhtml == '<span>第1章</span>'
+    assert sections[0].title_text == '第1章'
+    assert sections[0].paragraphs_xhtml == ['本文1', '本文2']
+    # 見出しがないセクション
+    assert sections[1].title_xhtml == ''
+    assert sections[1].title_text == ''
+    assert sections[1].paragraphs_xhtml == ['前書き']
+
+
+def test_extract_sections_finds_elements_nested_in_heading() -> None:
+    xml_str = (
+        '<section level="2"><heading>見出し<heading-text>よみ</heading-text>'
+        '<p>見出し内の段落</p></heading><p>本文</p></section>'
+    )
+
+    (section,) = _extract_sections(xml_str)
+
+    # heading 内の heading-text と p も（従来どおり）取り出される
+    assert section.title_text == 'よみ'
+    assert section.paragraphs_xhtml == ['見出し内の段落', '本文']
+
+
+def test_strip_xhtml_tags_keeps_ruby_base_text() -> None:
+    xhtml = '<span class="b"><ruby><rb>漢字</rb><rt>かんじ</rt></ruby>です</span>'
+
+    assert _strip_xhtml_tags(xhtml) == '漢字です'
+
+
+def test_strip_xhtml_tags_keeps_rt_text_outside_ruby() -> None:
+    assert _strip_xhtml_tags('前<rt>ルビ</rt>後') == '前ルビ後'
+    assert _strip_xhtml_tags('<ruby><rb>親</rb><rt>おや</rt></ruby><rt>外</rt>') == '親外'
+
+
+def test_strip_xhtml_tags_stops_at_ruby_end_without_rt_end() -> None:
+    # </rt> がなければ </ruby> の手前までを除去し、以降は残す
+    assert _strip_xhtml_tags('<ruby>親<rt>おや</ruby>の後ろ</rt>') == '親の後ろ'
+    # </rt> も </ruby> もなければ何も除去しない
+    assert _strip_xhtml_tags('<ruby>親<rt>おや') == '親おや'
+
+
+def test_strip_xhtml_tags_leaves_text_without_tags() -> None:
+    assert _strip_xhtml_tags('a < b > c') == 'a  c'
+    assert _strip_xhtml_tags('1 < 2') == '1 < 2'
+    assert _strip_xhtml_tags('本文<br/>続き') == '本文続き'
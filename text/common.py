@@ -76,64 +76,67 @@ class TextNormalizer:
         "〜": "から", "～": "から",
     }
 
+    # str.translate 用の変換テーブル（各マップのキーはすべて1文字で、
+    # 変換後の文字列が他のキーを含まないため、1回の走査で置換できる）
+    _READING_TRANS = str.maketrans({k: v for k, v in READING_MAP.items() if len(k) == 1})
+    # READING_MAP に複数文字のキー（str.maketrans では扱えない）が加わった場合は、
+    # 最長一致の選択パターン1回の走査で置換してから1文字キーを translate で変換する
+    _READING_MULTI_KEYS = sorted((k for k in READING_MAP if len(k) > 1), key=len, reverse=True)
+    _READING_MULTI_PATTERN = (
+        re.compile("|".join(map(re.escape, _READING_MULTI_KEYS))) if _READING_MULTI_KEYS else None
+    )
+    _CIRCLED_DIGIT_TRANS = str.maketrans(CIRCLED_DIGIT_MAP)
+    _ROMAN_NUMERAL_TRANS = str.maketrans(ROMAN_NUMERAL_MAP)
+    _CIRCLED_LETTER_TRANS = str.maketrans(CIRCLED_LETTERS, NORMAL_LETTERS)
+    _FULLWIDTH_DIGIT_TRANS = str.maketrans(FULLWIDTH_DIGITS, HALFWIDTH_DIGITS)
+    _HYPHEN_TRANS = str.maketrans(HYPHEN_MAP)
+    _BRACKET_TRANS = str.maketrans(BRACKET_MAP)
+    # normalize_all 用（括弧なし / 括弧あり）
+    _ALL_TRANS_NO_BRACKETS = {
+        **_CIRCLED_DIGIT_TRANS, **_ROMAN_NUMERAL_TRANS, **_CIRCLED_LETTER_TRANS,
+        **_FULLWIDTH_DIGIT_TRANS, **_HYPHEN_TRANS,
+    }
+    _ALL_TRANS = {**_ALL_TRANS_NO_BRACKETS, **_BRACKET_TRANS}
+
     @classmethod
     def to_reading(cls, text: str) -> str:
         """特殊文字を読み仮名に変換する（MFA用）。
 
         VOICEVOXと同じ読みを使用して、音声とテキストのアライメントを正確にする。
         """
-        result = text
-        for char, reading in cls.READING_MAP.items():
-            result = result.replace(char, reading)
-        return result
+        if cls._READING_MULTI_PATTERN is not None:
+            text = cls._READING_MULTI_PATTERN.sub(lambda m: cls.READING_MAP[m.group(0)], text)
+        return text.translate(cls._READING_TRANS)
 
     @classmethod
     def normalize_circled_digits(cls, text: str) -> str:
         """丸数字を半角数字に変換する。"""
-        result = text
-        for c, n in cls.CIRCLED_DIGIT_MAP.items():
-            result = result.replace(c, n)
-        return result
+        return text.translate(cls._CIRCLED_DIGIT_TRANS)
 
     @classmethod
     def normalize_roman_numerals(cls, text: str) -> str:
         """ローマ数字を半角数字に変換する。"""
-        result = text
-        for r, n in cls.ROMAN_NUMERAL_MAP.items():
-            result = result.replace(r, n)
-        return result
+        return text.translate(cls._ROMAN_NUMERAL_TRANS)
 
     @classmethod
     def normalize_circled_letters(cls, text: str) -> str:
         """丸囲み英字を半角英字に変換する。"""
-        result = text
-        for c, n in zip(cls.CIRCLED_LETTERS, cls.NORMAL_LETTERS):
-            result = result.replace(c, n)
-        return result
+        return text.translate(cls._CIRCLED_LETTER_TRANS)
 
     @classmethod
     def normalize_fullwidth_digits(cls, text: str) -> str:
         """全角数字を半角数字に変換する。"""
-        result = text
-        for z, h in zip(cls.FULLWIDTH_DIGITS, cls.HALFWIDTH_DIGITS):
-            result = result.replace(z, h)
-        return result
+        return text.translate(cls._FULLWIDTH_DIGIT_TRANS)
 
     @classmethod
     def normalize_hyphens(cls, text: str) -> str:
         """ハイフン・ダッシュを半角ハイフンに正規化する。"""
-        result = text
-        for src, dst in cls.HYPHEN_MAP.items():
-            result = result.replace(src, dst)
-        return result
+        return text.translate(cls._HYPHEN_TRANS)
 
     @classmethod
     def normalize_brackets(cls, text: str) -> str:
         """括弧を半角に正規化する。"""
-        result = text
-        for src, dst in cls.BRACKET_MAP.items():
-            result = result.replace(src, dst)
-        return result
+        return text.translate(cls._BRACKET_TRANS)
 
     @classmethod
     def normalize_all(cls, text: str, include_brackets: bool = True) -> str:
@@ -146,15 +149,9 @@ class TextNormalizer:
         include_brackets : bool
             括弧の正規化を含めるかどうか。MFA用ではFalse推奨。
         """
-        result = text
-        result = cls.normalize_circled_digits(result)
-        result = cls.normalize_roman_numerals(result)
-        result = cls.normalize_circled_letters(result)
-        result = cls.normalize_fullwidth_digits(result)
-        result = cls.normalize_hyphens(result)
         if include_brackets:
-            result = cls.normalize_brackets(result)
-        return result
+            return text.translate(cls._ALL_TRANS)
+        return text.translate(cls._ALL_TRANS_NO_BRACKETS)
 
 
 # =============================================================================
@@ -181,10 +178,12 @@ STRONG_PATTERN = re.compile(r'\*\*(.+?)\*\*', re.DOTALL)
 
 # Underlineパターン: [text]{.underline}
 # 内部にルビ記法 [...](-...) 、読み替え記法 [...](+...) 、frame記法 [...]{.frame} を含むことを許可
-# [^[\]]* : 角括弧以外の文字
-# (?:\[[^\]]*\](?:\([+-][^)]*\)|\{\.frame\})[^[\]]*)* : ルビ/読み替え/frame記法とその後のテキスト（0回以上繰り返し）
+# [^[\]]*+ : 角括弧以外の文字
+# (?:\[[^\]]*+\](?:\([+-][^)]*+\)|\{\.frame\})[^[\]]*+)*+ : ルビ/読み替え/frame記法とその後のテキスト（0回以上繰り返し）
+# 各要素は区切り文字（[ ] ) など）で一意に終わり、短く取り直しても一致しないため、
+# 強欲量指定子（*+）で後戻りを禁止して失敗時の再試行をなくす
 UNDERLINE_PATTERN = re.compile(
-    r'\[([^[\]]*(?:\[[^\]]*\](?:\([+-][^)]*\)|\{\.frame\})[^[\]]*)*)\]\{\.underline\}',
+    r'\[([^[\]]*+(?:\[[^\]]*+\](?:\([+-][^)]*+\)|\{\.frame\})[^[\]]*+)*+)\]\{\.underline\}',
     re.DOTALL
 )
 
@@ -192,16 +191,49 @@ UNDERLINE_PATTERN = re.compile(
 # Underlineと同様の構造で、内部にルビ記法や読み替え記法を含むことを許可
 # さらに{.frame}を含むことも許可（入れ子対応）
 FRAME_PATTERN = re.compile(
-    r'\[([^[\]]*(?:\[[^\]]*\](?:\([+-][^)]*\)|\{\.frame\})[^[\]]*)*)\]\{\.frame\}',
+    r'\[([^[\]]*+(?:\[[^\]]*+\](?:\([+-][^)]*+\)|\{\.frame\})[^[\]]*+)*+)\]\{\.frame\}',
     re.DOTALL
 )
 
 # 画像記法のパターン: ![代替テキスト](パス)
 IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
 
+# XHTML（XSLT出力）用のパターン
+# ruby要素: <ruby><rb>親字</rb><rt>読み</rt></ruby>（group(1): 親字, group(2): 読み）
+XHTML_RUBY_PATTERN = re.compile(r'<ruby><rb>(.*?)</rb><rt>(.*?)</rt></ruby>')
+
+# data-yomi属性付きspan（group(1): 読み）
+XHTML_YOMI_SPAN_PATTERN = re.compile(r'<span\b[^>]*\bdata-yomi="([^"]*)"[^>]*>.*?</span>')
+
+# MathML要素: <math ...>...</math>
+MATHML_PATTERN = re.compile(r'<math\b[^>]*>.*?</math>', re.DOTALL)
+
+# 任意のタグ（開始・終了・空要素）
+XHTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def compile_alternation(named_patterns: list[tuple[str, re.Pattern]]) -> re.Pattern:
+    """複数のパターンを名前付きグループの選択（|）に結合する。
+
+    先頭のパターンから順に試すため、同じ位置で各パターンを順に match() した
+    場合と同じものが選ばれる（どれが一致したかは m.lastgroup で分かる）。
+    DOTALL付きのパターンはその部分だけにフラグを適用する。
+    各パターン内の n 番目のグループは m.re.groupindex[名前] + n で参照する
+    （番号による後方参照を含むパターンは結合できない）。
+    """
+    parts = []
+    for name, pattern in named_patterns:
+        body = f'(?s:{pattern.pattern})' if pattern.flags & re.DOTALL else pattern.pattern
+        parts.append(f'(?P<{name}>{body})')
+    return re.compile('|'.join(parts))
+
 # 枠のスタイル（一箇所で管理）
 FRAME_STYLE = "border: solid 2px; padding: 0.25em; margin:0em 0.2em 0em 0.2em; white-space: nowrap;"
 
+# frame_to_xhtml の置換テンプレート（re.sub がコールバックなしで展開する）
+# FRAME_STYLE 中のバックスラッシュがテンプレートのエスケープとして解釈されないよう二重化する
+_FRAME_REPL = '<span style="' + FRAME_STYLE.replace('\\', '\\\\') + r'">\g<1></span>'
+
 
 def ruby_to_reading(text: str) -> str:
     """ルビ記法をひらがな読みに変換
@@ -256,9 +288,51 @@ def frame_to_xhtml(text: str) -> str:
 
     例: [　ア　]{.frame} → <span style="...">　ア　</span>
     """
-    def replace_frame(m):
-        return f'<span style="{FRAME_STYLE}">{m.group(1)}</span>'
-    return FRAME_PATTERN.sub(replace_frame, text)
+    return FRAME_PATTERN.sub(_FRAME_REPL, text)
+
+
+# strip_formatting / strip_formatting_for_display の置換手順（この順に適用する）
+# (パターン, 一致に必須の部分文字列, 読み用の置換, 表示用の置換)
+# 前の置換結果に対して次の置換を行うため、1つの正規表現にはまとめられない。
+# 必須の部分文字列を含まないテキストではそのパターンは一致しないので、走査自体を省略する。
+_STRIP_STEPS: tuple[tuple[re.Pattern, str, str, str], ...] = (
+    # 画像: ![alt](path) → alt（読み）/ 除去（表示） ※他の記法より先に処理
+    (IMAGE_PATTERN, '![', r'\1', ''),
+    # Underline: [text]{.underline} → text
+    (UNDERLINE_PATTERN, ']{.underline}', r'\1', r'\1'),
+    # Frame: [text]{.frame} → text
+    (FRAME_PATTERN, ']{.frame}', r'\1', r'\1'),
+    # 太字: **text** → text
+    (STRONG_PATTERN, '**', r'\1', r'\1'),
+    # 読み替え: [表示](+読み) → 読み / 表示（ルビより先に処理）
+    (READING_SUB_PATTERN, '](+', r'\2', r'\1'),
+    # ルビ: [漢字](-ふりがな) → ふりがな / 漢字
+    (RUBY_PATTERN, '](-', r'\2', r'\1'),
+    # 下付き: ~text~ → text
+    (SUBSCRIPT_PATTERN, '~', r'\1', r'\1'),
+    # 上付き: ^text^ → text
+    (SUPERSCRIPT_PATTERN, '^', r'\1', r'\1'),
+)
+
+
+def _may_have_formatting(text: str) -> bool:
+    """
+    書式記法を含む可能性があるかを返す。
+
+    _STRIP_STEPS のどのパターンも '[' '**' '~' '^' のいずれかを必要とするため、
+    これらを含まないテキストは正規表現を使わずにそのまま返せる。
+    """
+    return '[' in text or '**' in text or '~' in text or '^' in text
+
+
+def _apply_strip_steps(text: str, for_display: bool) -> str:
+    """_STRIP_STEPS を順に適用する。"""
+    repl_index = 3 if for_display else 2
+    result = text
+    for step in _STRIP_STEPS:
+        if step[1] in result:
+            result = step[0].sub(step[repl_index], result)
+    return result
 
 
 def strip_formatting(text: str) -> str:
@@ -278,24 +352,9 @@ def strip_formatting(text: str) -> str:
         [text]{.underline} → text
         ![代替テキスト](path.png) → 代替テキスト
     """
-    result = text
-    # 画像: ![alt](path) → alt テキスト ※他の記法より先に処理
-    result = IMAGE_PATTERN.sub(r'\1', result)
-    # Underline: [text]{.underline} → text
-    result = UNDERLINE_PATTERN.sub(r'\1', result)
-    # Frame: [text]{.frame} → text
-    result = FRAME_PATTERN.sub(r'\1', result)
-    # 太字: **text** → text
-    result = STRONG_PATTERN.sub(r'\1', result)
-    # 読み替え: [表示](+読み) → 読み（ルビより先に処理）
-    result = READING_SUB_PATTERN.sub(r'\2', result)
-    # ルビ: [漢字](-ふりがな) → ふりがな
-    result = RUBY_PATTERN.sub(r'\2', result)
-    # 下付き: ~text~ → text
-    result = SUBSCRIPT_PATTERN.sub(r'\1', result)
-    # 上付き: ^text^ → text
-    result = SUPERSCRIPT_PATTERN.sub(r'\1', result)
-    return result
+    if not _may_have_formatting(text):
+        return text
+    return _apply_strip_steps(text, for_display=False)
 
 
 def strip_formatting_for_display(text: str) -> str:
@@ -315,39 +374,27 @@ def strip_formatting_for_display(text: str) -> str:
         $x^2$ → [数式] （数式プレースホルダーは表示用テキストに変換）
     """
     import re as _re
+    has_math = '\x02' in text
+    if not has_math and not _may_have_formatting(text):
+        return text
     result = text
     # 数式プレースホルダー: \x02MATH{idx}\x02 → "[数式]"（表示用フォールバック）
     # （MathProcessorがあれば音声テキストを使用）
-    try:
-        from mathconv.converter import get_current_processor, MATH_PLACEHOLDER_PATTERN
-        math_proc = get_current_processor()
-        if math_proc:
-            def _math_to_display(m: _re.Match) -> str:
-                idx = int(m.group(1))
-                entry = math_proc.get_entry(idx)
-                return entry.speech if entry else "[数式]"
-            result = MATH_PLACEHOLDER_PATTERN.sub(_math_to_display, result)
-        else:
+    if has_math:
+        try:
+            from mathconv.converter import get_current_processor, MATH_PLACEHOLDER_PATTERN
+            math_proc = get_current_processor()
+            if math_proc:
+                def _math_to_display(m: _re.Match) -> str:
+                    idx = int(m.group(1))
+                    entry = math_proc.get_entry(idx)
+                    return entry.speech if entry else "[数式]"
+                result = MATH_PLACEHOLDER_PATTERN.sub(_math_to_display, result)
+            else:
+                result = _re.sub(r'\x02MATH\d+\x02', '[数式]', result)
+        except ImportError:
             result = _re.sub(r'\x02MATH\d+\x02', '[数式]', result)
-    except ImportError:
-        result = _re.sub(r'\x02MATH\d+\x02', '[数式]', result)
-    # 画像: ![alt](path) → (除去) ※他の記法より先に処理
-    result = IMAGE_PATTERN.sub('', result)
-    # Underline: [text]{.underline} → text
-    result = UNDERLINE_PATTERN.sub(r'\1', result)
-    # Frame: [text]{.frame} → text
-    result = FRAME_PATTERN.sub(r'\1', result)
-    # 太字: **text** → text
-    result = STRONG_PATTERN.sub(r'\1', result)
-    # 読み替え: [表示](+読み) → 表示（表示テキストを保持）
-    result = READING_SUB_PATTERN.sub(r'\1', result)
-    # ルビ: [漢字](-ふりがな) → 漢字（漢字を保持）
-    result = RUBY_PATTERN.sub(r'\1', result)
-    # 下付き: ~text~ → text
-    result = SUBSCRIPT_PATTERN.sub(r'\1', result)
-    # 上付き: ^text^ → text
-    result = SUPERSCRIPT_PATTERN.sub(r'\1', result)
-    return result
+    return _apply_strip_steps(result, for_display=True)
 
 
 def create_reading_file(input_path: str, output_path: str) -> None:
@@ -364,31 +411,30 @@ def create_reading_file(input_path: str, output_path: str) -> None:
     - 太字 **text** → text
     - Underline [text]{.underline} → text
     - 丸数字・ローマ数字 → 読み仮名（MFA用）
+
+    太字・下線・数式（$$...$$）などは複数行にまたがり得るため、
+    行単位ではなくファイル全体をまとめて変換する。
     """
-    with open(input_path, 'r', encoding='utf-8') as f:
-        text = f.read()
-    # 数式を音声テキストに変換（見出しなしCommonMark用）
     try:
         from mathconv.converter import get_current_processor
         math_proc = get_current_processor()
-        if math_proc:
-            text = math_proc.substitute(text)
     except ImportError:
-        pass
+        math_proc = None
+
+    with open(input_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    # 数式を音声テキストに変換（見出しなしCommonMark用）
+    if math_proc:
+        text = math_proc.substitute(text)
     # 書式記法を除去
-    result = strip_formatting(text)
+    text = strip_formatting(text)
     # 数式プレースホルダーを音声テキストに展開
-    try:
-        from mathconv.converter import get_current_processor
-        math_proc = get_current_processor()
-        if math_proc:
-            result = math_proc.to_speech(result)
-    except ImportError:
-        pass
+    if math_proc:
+        text = math_proc.to_speech(text)
     # 特殊文字を読み仮名に変換（MFAアライメント用）
-    result = TextNormalizer.to_reading(result)
+    text = TextNormalizer.to_reading(text)
     with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(result)
+        f.write(text)
 
 
 def change_suffix(origin_path_str:str, suffix:str):
@@ -4,6 +4,9 @@
 ルビ記法、書式記法の処理、位置マッピング等の
 テキスト処理機能を提供します。
 """
+import re
+import threading
+from functools import lru_cache
 from html import escape
 
 from pathlib import Path
@@ -18,17 +21,133 @@ from text.common import (
     FRAME_PATTERN,
     IMAGE_PATTERN,
     FRAME_STYLE,
+    compile_alternation,
     ruby_to_xhtml,
     strip_formatting,
     TextNormalizer,
 )
+from mathconv.converter import register_processor_change_hook
+
+
+# reading_pos_to_original 用: 各書式記法を1回の match で判定する
+# （並び順が判定の優先順位。先頭文字がこれ以外の位置では書式記法は始まらない）
+_FORMAT_TOKEN_PATTERN = compile_alternation([
+    ('underline', UNDERLINE_PATTERN),
+    ('frame', FRAME_PATTERN),
+    ('strong', STRONG_PATTERN),
+    ('reading_sub', READING_SUB_PATTERN),
+    ('ruby', RUBY_PATTERN),
+    ('sub', SUBSCRIPT_PATTERN),
+    ('sup', SUPERSCRIPT_PATTERN),
+    ('image', IMAGE_PATTERN),
+])
+_FORMAT_GROUP_INDEX = _FORMAT_TOKEN_PATTERN.groupindex
+_FORMAT_START_CHARS = frozenset('[*~^!')
+# READING_MAP の1文字キー → 読みの長さ（reading_pos_to_original で1回の参照で済ませる）
+_READING_EXPANSION_LEN = {k: len(v) for k, v in TextNormalizer.READING_MAP.items() if len(k) == 1}
+# 1文字ずつ判定が必要な文字（書式記法の開始文字・数式プレースホルダー・READING_MAPのキー）。
+# それ以外の通常の文字が続く区間は reading_pos_to_original でまとめて進める
+_SPECIAL_CHAR_PATTERN = re.compile('[{}]'.format(re.escape(''.join(sorted(
+    _FORMAT_START_CHARS | {'\x02'} | set(_READING_EXPANSION_LEN)
+)))))
+# 内部テキストを持つ書式記法の開始記号の長さ（[ / ** / ~ / ^）
+_FORMAT_OPEN_LEN = {'underline': 1, 'frame': 1, 'strong': 2, 'sub': 1, 'sup': 1}
+
+
+# get_original_range の終了位置拡張: 範囲の直後に続く書式記法の閉じ記号（優先順に並べる）
+_END_BRACKET_CLOSE_PATTERN = re.compile(
+    r'\]\{\.frame\}\*\*|\]\{\.underline\}\*\*|\]\{\.frame\}|\]\{\.underline\}'
+)
+_END_MARK_PATTERN = re.compile(r'\*\*|~|\^')
 
 
+@lru_cache(maxsize=4096)
 def _get_reading_len(text: str) -> int:
-    """テキストの読み長さを計算する（READING_MAP展開を考慮）。"""
+    """テキストの読み長さを計算する（READING_MAP展開を考慮）。
+
+    同じ内部テキスト（同じ語への繰り返しの下線など）は一度だけ計算する。
+    """
     return len(TextNormalizer.to_reading(strip_formatting(text)))
 
 
+@lru_cache(maxsize=1024)
+def _tokenize(text: str, math_proc) -> tuple[tuple[str, int, int, int, str, int], ...]:
+    """
+    reading_pos_to_original 用に、テキストを先頭から区間に分割する。
+
+    各区間は (種類, 開始位置, 終了位置, 読みの長さ, 内部テキスト, 開始記号の長さ)。
+    種類は 'math'（数式プレースホルダー）、書式記法（_FORMAT_TOKEN_PATTERN のグループ名）、
+    'expansion'（READING_MAP文字）、'plain'（通常の文字の並び）のいずれか。
+    内部テキストと開始記号の長さは、内部へ進む書式記法（underline 等）のみ持つ。
+
+    分割結果は読み位置に依存しないため、同じテキストへの繰り返しの位置変換
+    （get_original_range の開始・終了位置など）では再利用する。
+    数式の読みの長さは MathProcessor に依存するため、キャッシュのキーに含める。
+    MathProcessor が切り替わるとキャッシュを破棄するため、以前の MathProcessor は保持しない。
+    """
+    if math_proc:
+        from mathconv.converter import MATH_PLACEHOLDER_PATTERN
+
+    segments: list[tuple[str, int, int, int, str, int]] = []
+    pos = 0
+    text_len = len(text)
+    while pos < text_len:
+        char = text[pos]
+
+        # 数式プレースホルダー: \x02MATH{idx}\x02（対応するエントリがない場合は通常の文字）
+        if math_proc and char == '\x02':
+            math_match = MATH_PLACEHOLDER_PATTERN.match(text, pos)
+            if math_match:
+                entry = math_proc.get_entry(int(math_match.group(1)))
+                if entry is not None:
+                    segments.append(('math', pos, math_match.end(), len(entry.speech), '', 0))
+                    pos = math_match.end()
+                    continue
+
+        # 書式記法（文字列を切り出さず、位置を指定して1回で判定）
+        format_match = (
+            _FORMAT_TOKEN_PATTERN.match(text, pos)
+            if char in _FORMAT_START_CHARS else None
+        )
+        if format_match:
+            kind = format_match.lastgroup
+            group = _FORMAT_GROUP_INDEX[kind]
+            inner_text = ''
+            if kind == 'reading_sub' or kind == 'ruby':
+                # 読み替え記法 [表示](+読み) / ルビ記法 [漢字](-ふりがな): 読み部分の長さ
+                reading_len = len(format_match.group(group + 2))
+            elif kind == 'image':
+                # 画像記法 ![alt](path): alt テキストの読みの長さ
+                reading_len = _get_reading_len(format_match.group(group + 1))
+            else:
+                # 内部テキストを持つ書式（READING_MAP展開を考慮）
+                inner_text = format_match.group(group + 1)
+                reading_len = _get_reading_len(inner_text)
+            segments.append((kind, pos, format_match.end(), reading_len,
+                             inner_text, _FORMAT_OPEN_LEN.get(kind, 0)))
+            pos = format_match.end()
+            continue
+
+        # READING_MAP文字（丸数字・ローマ数字・丸囲み英字など）: 1文字が複数文字の読みに展開される
+        expansion_len = _READING_EXPANSION_LEN.get(char)
+        if expansion_len is not None:
+            segments.append(('expansion', pos, pos + 1, expansion_len, '', 0))
+            pos += 1
+            continue
+
+        # 通常の文字: 次に判定が必要な文字の手前までを1区間とする
+        special_match = _SPECIAL_CHAR_PATTERN.search(text, pos + 1)
+        run_end = special_match.start() if special_match else text_len
+        segments.append(('plain', pos, run_end, run_end - pos, '', 0))
+        pos = run_end
+
+    return tuple(segments)
+
+
+# MathProcessor の切り替え時に分割結果を破棄する
+register_processor_change_hook(_tokenize.cache_clear)
+
+
 def normalize_text(text: str) -> str:
     """
     テキストを正規化する。
@@ -88,12 +207,14 @@ def normalize_text(text: str) -> str:
     return result
 
 
+@lru_cache(maxsize=2048)
 def strip_ruby(text: str) -> str:
     """
     ルビ記法から漢字部分のみを抽出する（ふりがなを削除）。
 
     nav.xhtmlのタイトル表示など、ルビなしのプレーンテキストが
-    必要な場合に使用します。
+    必要な場合に使用します。同じ見出し（「第N章」等）の繰り返しに備えて
+    結果をキャッシュします。
 
     Parameters
     ----------
@@ -115,6 +236,7 @@ def strip_ruby(text: str) -> str:
     return RUBY_PATTERN.sub(r'\1', text)
 
 
+@lru_cache(maxsize=2048)
 def escape_with_ruby(text: str) -> str:
     """
     ルビ記法を保持しつつHTMLエスケープを行う。
@@ -141,28 +263,22 @@ def escape_with_ruby(text: str) -> str:
 
     Notes
     -----
-    処理手順:
-    1. ルビ記法を一時プレースホルダーに置換
-    2. プレースホルダー以外をHTMLエスケープ
-    3. プレースホルダーをrubyタグに復元
+    RUBY_PATTERN.split() でルビ記法以外の部分とルビ記法（親字, ふりがな）に分け、
+    ルビ記法以外の部分だけをHTMLエスケープして1回で連結する。
+    短い見出しに繰り返し使われるため、結果をキャッシュする。
     """
-    # 1. ルビ記法を一時プレースホルダーに置換
-    placeholders: list[str] = []
-
-    def save_ruby(m):
-        placeholders.append(m.group(0))
-        return f'\x00{len(placeholders) - 1}\x00'
-
-    temp = RUBY_PATTERN.sub(save_ruby, text)
+    parts = RUBY_PATTERN.split(text)
+    # parts: [ルビ以外, 親字, ふりがな, ルビ以外, 親字, ふりがな, ..., ルビ以外]
+    out: list[str] = []
+    for i in range(0, len(parts) - 1, 3):
+        out.append(escape(parts[i]))
+        out.append(f'<ruby>{parts[i + 1]}<rt>{parts[i + 2]}</rt></ruby>')
+    out.append(escape(parts[-1]))
+    return ''.join(out)
 
-    # 2. ルビ以外をHTMLエスケープ
-    temp = escape(temp)
 
-    # 3. プレースホルダーをrubyタグに戻す
-    for i, ruby_text in enumerate(placeholders):
-        temp = temp.replace(f'\x00{i}\x00', ruby_to_xhtml(ruby_text))
-
-    return temp
+# FormattingHandler のプレースホルダー: \x00{idx}\x00
+_PLACEHOLDER_TOKEN_PATTERN = re.compile(r'\x00([0-9]+)\x00')
 
 
 class FormattingHandler:
@@ -214,18 +330,27 @@ class FormattingHandler:
     def _save_superscript(self, m) -> str:
         return self._save_placeholder('sup', m.group(1), m.group(0))
 
+    # プレースホルダー置換の手順（処理順序: 外側から内側へ）
+    # (パターン, 一致に必須の部分文字列, 保存メソッド名)
+    # 前の置換結果に対して次の置換を行う（前の記法が優先される）ため、1つの正規表現にはまとめない。
+    # 必須の部分文字列を含まないテキストではそのパターンは一致しないので、走査自体を省略する。
+    _PLACEHOLDER_STEPS: tuple[tuple[re.Pattern, str, str], ...] = (
+        (IMAGE_PATTERN, '![', '_save_image'),
+        (UNDERLINE_PATTERN, ']{.underline}', '_save_underline'),
+        (FRAME_PATTERN, ']{.frame}', '_save_frame'),
+        (STRONG_PATTERN, '**', '_save_strong'),
+        (READING_SUB_PATTERN, '](+', '_save_reading_sub'),
+        (RUBY_PATTERN, '](-', '_save_ruby'),
+        (SUBSCRIPT_PATTERN, '~', '_save_subscript'),
+        (SUPERSCRIPT_PATTERN, '^', '_save_superscript'),
+    )
+
     def _replace_with_placeholders(self, text: str) -> str:
         """すべての書式記法をプレースホルダーに置換する。"""
         temp = text
-        # 処理順序: 外側から内側へ
-        temp = IMAGE_PATTERN.sub(self._save_image, temp)
-        temp = UNDERLINE_PATTERN.sub(self._save_underline, temp)
-        temp = FRAME_PATTERN.sub(self._save_frame, temp)
-        temp = STRONG_PATTERN.sub(self._save_strong, temp)
-        temp = READING_SUB_PATTERN.sub(self._save_reading_sub, temp)
-        temp = RUBY_PATTERN.sub(self._save_ruby, temp)
-        temp = SUBSCRIPT_PATTERN.sub(self._save_subscript, temp)
-        temp = SUPERSCRIPT_PATTERN.sub(self._save_superscript, temp)
+        for pattern, required, save_name in self._PLACEHOLDER_STEPS:
+            if required in temp:
+                temp = pattern.sub(getattr(self, save_name), temp)
         return temp
 
     def _restore_placeholder(self, tag: str, inner: str, original: str) -> str:
@@ -253,22 +378,47 @@ class FormattingHandler:
         inner_processed = escape_with_formatting(inner)
         return f'<{tag}>{inner_processed}</{tag}>'
 
-    def _restore_all_placeholders(self, text: str) -> str:
-        """すべてのプレースホルダーをXHTMLタグに復元する。"""
-        result = text
-        # 逆順に復元（内側から外側へ）
-        for i in range(len(self.placeholders) - 1, -1, -1):
-            tag, inner, original = self.placeholders[i]
+    def _escape_and_restore(self, text: str) -> str:
+        """
+        プレースホルダー以外の部分をHTMLエスケープし、プレースホルダーをXHTMLタグに復元する。
+
+        エスケープはプレースホルダーの間の文字列にだけ行い、
+        復元したXHTML（内部はそれぞれの変換でエスケープ済み）と1回で連結する。
+        """
+        if not self.placeholders:
+            return escape(text)
+        # 内部テキストの変換（escape_with_formatting）は同じハンドラーを使うため、
+        # この変換のプレースホルダーは手元に移してから復元する
+        placeholders, self.placeholders = self.placeholders, []
+
+        # 後から保存した（内側の）記法のXHTMLには、それより前に保存したプレースホルダーが
+        # 残っていることがあるため、番号の小さい順にXHTMLを作り、その中の前の番号を展開しておく。
+        rendered: list[str] = []
+
+        def _lookup(m: re.Match) -> str:
+            idx = int(m.group(1))
+            return rendered[idx] if idx < len(rendered) else m.group(0)
+
+        for tag, inner, original in placeholders:
             xhtml = self._restore_placeholder(tag, inner, original)
-            result = result.replace(f'\x00{i}\x00', xhtml)
-        return result
+            if '\x00' in xhtml:
+                xhtml = _PLACEHOLDER_TOKEN_PATTERN.sub(_lookup, xhtml)
+            rendered.append(xhtml)
+
+        # parts: [文字列, 番号, 文字列, 番号, ..., 文字列]
+        parts = _PLACEHOLDER_TOKEN_PATTERN.split(text)
+        out = [escape(parts[0])]
+        for i in range(1, len(parts), 2):
+            idx = int(parts[i])
+            out.append(rendered[idx] if idx < len(rendered) else f'\x00{parts[i]}\x00')
+            out.append(escape(parts[i + 1]))
+        return ''.join(out)
 
     def convert(self, text: str) -> str:
         """書式記法をXHTMLタグに変換する。"""
         self.placeholders.clear()
         temp = self._replace_with_placeholders(text)
-        temp = escape(temp)
-        temp = self._restore_all_placeholders(temp)
+        temp = self._escape_and_restore(temp)
         # 壊れた**パターンを除去
         temp = temp.replace('**', '')
         # 数式プレースホルダー（\x02MATH{idx}\x02）をMathML要素に展開
@@ -279,6 +429,18 @@ class FormattingHandler:
         return temp
 
 
+# スレッドごとに使い回す FormattingHandler（呼び出しごとの生成を避ける）
+_thread_local = threading.local()
+
+
+def _get_handler() -> FormattingHandler:
+    """呼び出し元スレッド用の FormattingHandler を返す。"""
+    handler = getattr(_thread_local, "handler", None)
+    if handler is None:
+        handler = _thread_local.handler = FormattingHandler()
+    return handler
+
+
 def escape_with_formatting(text: str) -> str:
     """
     すべての書式記法を保持しつつHTMLエスケープを行う。
@@ -309,7 +471,7 @@ def escape_with_formatting(text: str) -> str:
     >>> escape_with_formatting("**重要**")
     '<strong>重要</strong>'
     """
-    return FormattingHandler().convert(text)
+    return _get_handler().convert(text)
 
 
 def reading_pos_to_original(text: str, reading_pos: int) -> int:
@@ -347,185 +509,121 @@ def reading_pos_to_original(text: str, reading_pos: int) -> int:
     - Strong: **text** → text
     - Subscript: ~text~ → text
     - Superscript: ^text^ → text
+
+    テキストは _tokenize() で区間に分割（結果はキャッシュ）し、区間単位で読み位置を進める。
     """
-    original_pos = 0
+    from mathconv.converter import get_current_processor
+    math_proc = get_current_processor()
+    return _segments_pos_to_original(text, _tokenize(text, math_proc), reading_pos, math_proc)
+
+
+def _segments_pos_to_original(
+    text: str,
+    segments: tuple[tuple[str, int, int, int, str, int], ...],
+    reading_pos: int,
+    math_proc,
+) -> int:
+    """reading_pos_to_original の本体（text の分割結果 segments を受け取る）。"""
+    # 書式記法の内部へ進んだ場合の、走査中テキストの元テキストでの開始位置
+    base_offset = 0
     current_reading_pos = 0
-
-    # 数式プロセッサを一度だけ取得（ループ内で毎回呼ぶコストを避ける）
-    from mathconv.converter import get_current_processor, MATH_PLACEHOLDER_PATTERN as _MATH_PH_PATTERN
-    _math_proc = get_current_processor()
-
-    while current_reading_pos <= reading_pos and original_pos < len(text):
+    i = 0
+    while i < len(segments):
+        kind, start, end, reading_len, inner_text, open_len = segments[i]
         # current_reading_pos == reading_pos の場合、パターン内部への再帰が必要かチェック
         at_target = (current_reading_pos == reading_pos)
-
-        remaining = text[original_pos:]
-
-        # 数式プレースホルダーのチェック: \x02MATH{idx}\x02
-        if _math_proc and remaining and remaining[0] == '\x02':
-            math_match = _MATH_PH_PATTERN.match(remaining)
-            if math_match:
-                idx = int(math_match.group(1))
-                entry = _math_proc.get_entry(idx)
-                if entry is not None:
-                    placeholder_len = len(math_match.group(0))
-                    speech_len = len(entry.speech)
-                    if at_target:
-                        # プレースホルダーの先頭に到達 → 先頭位置を返す
-                        return original_pos
-                    elif current_reading_pos + speech_len <= reading_pos:
-                        # プレースホルダー全体をスキップ
-                        current_reading_pos += speech_len
-                        original_pos += placeholder_len
-                        continue
-                    else:
-                        # プレースホルダーの途中 → 末尾位置を返す（orig_end計算用）
-                        return original_pos + placeholder_len
-
-        # Underline記法のチェック: [text]{.underline}
-        underline_match = UNDERLINE_PATTERN.match(remaining)
-        if underline_match:
-            inner_text = underline_match.group(1)
-            inner_reading_len = _get_reading_len(inner_text)
-            if current_reading_pos + inner_reading_len <= reading_pos and not at_target:
-                current_reading_pos += inner_reading_len
-                original_pos += len(underline_match.group(0))
-                continue
-            else:
-                # 内部の途中またはパターン開始位置でreading_posに達した場合、内部を再帰的に処理
-                inner_offset = reading_pos - current_reading_pos
-                inner_pos = reading_pos_to_original(inner_text, inner_offset)
-                # [の後 + 内部位置
-                return original_pos + 1 + inner_pos
-
-        # Frame記法のチェック: [text]{.frame}
-        frame_match = FRAME_PATTERN.match(remaining)
-        if frame_match:
-            inner_text = frame_match.group(1)
-            inner_reading_len = _get_reading_len(inner_text)
-            if current_reading_pos + inner_reading_len <= reading_pos and not at_target:
-                current_reading_pos += inner_reading_len
-                original_pos += len(frame_match.group(0))
-                continue
-            else:
-                # 内部の途中またはパターン開始位置でreading_posに達した場合、内部を再帰的に処理
-                inner_offset = reading_pos - current_reading_pos
-                inner_pos = reading_pos_to_original(inner_text, inner_offset)
-                # [の後 + 内部位置
-                return original_pos + 1 + inner_pos
-
-        # Strong記法のチェック: **text**
-        strong_match = STRONG_PATTERN.match(remaining)
-        if strong_match:
-            inner_text = strong_match.group(1)
-            inner_reading_len = _get_reading_len(inner_text)
-            if current_reading_pos + inner_reading_len <= reading_pos and not at_target:
-                current_reading_pos += inner_reading_len
-                original_pos += len(strong_match.group(0))
-                continue
-            else:
-                # 内部の途中またはパターン開始位置でreading_posに達した場合、内部を再帰的に処理
-                inner_offset = reading_pos - current_reading_pos
-                inner_pos = reading_pos_to_original(inner_text, inner_offset)
-                # **の後 + 内部位置
-                return original_pos + 2 + inner_pos
-
-        # 読み替え記法のチェック: [表示](+読み)
-        reading_sub_match = READING_SUB_PATTERN.match(remaining)
-        if reading_sub_match:
-            reading_len = len(reading_sub_match.group(2))  # 読み上げ部分の長さ
-            if current_reading_pos + reading_len <= reading_pos and not at_target:
+        fits = current_reading_pos + reading_len <= reading_pos
+
+        if kind == 'plain':
+            # 通常の文字の並び
+            if at_target:
+                # 目標位置に到達（パターンではない通常文字）
+                return base_offset + start
+            if fits:
                 current_reading_pos += reading_len
-                original_pos += len(reading_sub_match.group(0))
+                i += 1
                 continue
-            else:
-                # 読み替えの途中でreading_posに達した場合、全体を含める
-                break
-
-        # ルビ記法のチェック: [漢字](-ふりがな)
-        ruby_match = RUBY_PATTERN.match(remaining)
-        if ruby_match:
-            reading_len = len(ruby_match.group(2))  # ふりがな部分の長さ
-            if current_reading_pos + reading_len <= reading_pos and not at_target:
+            return base_offset + start + (reading_pos - current_reading_pos)
+
+        if kind == 'math':
+            # 数式プレースホルダー: \x02MATH{idx}\x02
+            if at_target:
+                # プレースホルダーの先頭に到達 → 先頭位置を返す
+                return base_offset + start
+            if fits:
+                # プレースホルダー全体をスキップ
                 current_reading_pos += reading_len
-                original_pos += len(ruby_match.group(0))
+                i += 1
                 continue
-            else:
-                # ルビの途中でreading_posに達した場合、ルビ全体を含める
-                break
+            # プレースホルダーの途中 → 末尾位置を返す（orig_end計算用）
+            return base_offset + end
 
-        # Subscript記法のチェック: ~text~
-        subscript_match = SUBSCRIPT_PATTERN.match(remaining)
-        if subscript_match:
-            inner_text = subscript_match.group(1)
-            inner_reading_len = _get_reading_len(inner_text)  # READING_MAP展開を考慮
-            if current_reading_pos + inner_reading_len <= reading_pos and not at_target:
-                current_reading_pos += inner_reading_len
-                original_pos += len(subscript_match.group(0))
-                continue
-            else:
-                # 内部の途中またはパターン開始位置でreading_posに達した場合、内部を再帰的に処理
-                inner_offset = reading_pos - current_reading_pos
-                inner_pos = reading_pos_to_original(inner_text, inner_offset)
-                # ~の後 + 内部位置
-                return original_pos + 1 + inner_pos
-
-        # Superscript記法のチェック: ^text^
-        superscript_match = SUPERSCRIPT_PATTERN.match(remaining)
-        if superscript_match:
-            inner_text = superscript_match.group(1)
-            inner_reading_len = _get_reading_len(inner_text)  # READING_MAP展開を考慮
-            if current_reading_pos + inner_reading_len <= reading_pos and not at_target:
-                current_reading_pos += inner_reading_len
-                original_pos += len(superscript_match.group(0))
-                continue
-            else:
-                # 内部の途中またはパターン開始位置でreading_posに達した場合、内部を再帰的に処理
-                inner_offset = reading_pos - current_reading_pos
-                inner_pos = reading_pos_to_original(inner_text, inner_offset)
-                # ^の後 + 内部位置
-                return original_pos + 1 + inner_pos
-
-        # 画像記法のチェック: ![alt](path) （atomic に扱う）
-        image_match = IMAGE_PATTERN.match(remaining)
-        if image_match:
-            alt_text = image_match.group(1)
-            reading_len = _get_reading_len(alt_text)
-            image_len = len(image_match.group(0))
-            if current_reading_pos + reading_len <= reading_pos and not at_target:
-                # 画像全体をスキップ（reading_pos が alt テキスト末尾以降）
-                current_reading_pos += reading_len
-                original_pos += image_len
-                continue
-            elif at_target:
-                # 画像先頭に到達 → '!' の位置を返す（orig_start 用）
-                break
-            else:
-                # alt テキスト内部 → 画像末尾位置を返す（orig_end 用）
-                return original_pos + image_len
-
-        # READING_MAP文字のチェック（丸数字・ローマ数字・丸囲み英字など）
-        # これらは1文字が複数文字の読みに展開される
-        current_char = text[original_pos] if original_pos < len(text) else ''
-        if current_char in TextNormalizer.READING_MAP:
-            reading_expansion = TextNormalizer.READING_MAP[current_char]
-            expansion_len = len(reading_expansion)
-            if current_reading_pos + expansion_len <= reading_pos and not at_target:
-                current_reading_pos += expansion_len
-                original_pos += 1
-                continue
-            else:
-                # 展開の途中でreading_posに達した場合、元の文字全体を含める
-                return original_pos
+        if fits and not at_target:
+            # 区間全体が reading_pos より前にある
+            current_reading_pos += reading_len
+            i += 1
+            continue
 
-        # 通常の文字
-        if at_target:
-            # 目標位置に到達（パターンではない通常文字）
-            return original_pos
-        current_reading_pos += 1
-        original_pos += 1
+        if kind == 'reading_sub' or kind == 'ruby' or kind == 'expansion':
+            # 読み替え・ルビ・READING_MAP文字の途中でreading_posに達した場合、全体を含める
+            return base_offset + start
 
-    return original_pos
+        if kind == 'image':
+            # 画像先頭に到達 → '!' の位置（orig_start 用）、alt テキスト内部 → 画像末尾位置（orig_end 用）
+            return base_offset + (start if at_target else end)
+
+        # Underline / Frame / Strong / Subscript / Superscript の内部の途中、
+        # またはパターン開始位置でreading_posに達した場合、内部を処理する
+        # （再帰せず、走査対象を開始記号の後の内部テキストに切り替える）
+        base_offset += start + open_len
+        reading_pos -= current_reading_pos
+        text = inner_text
+        segments = _tokenize(text, math_proc)
+        current_reading_pos = 0
+        i = 0
+
+    return base_offset + len(text)
+
+
+def _expand_end(text: str, orig_end: int, expand_bracket: bool) -> int:
+    """
+    get_original_range の終了位置を、直後に続く書式記法の閉じ記号まで拡張する。
+
+    expand_bracket が True（範囲内に未閉じの[がある）の場合のみ
+    ]{.frame} / ]{.underline} まで拡張し、それ以外は **, ~, ^ のみを含める。
+    """
+    if not expand_bracket:
+        # 未閉じの[がない場合、]{.frame/underline}拡張はスキップ
+        # **（単独のstrong）/ ~（subscript終了）/ ^（superscript終了）
+        end_match = _END_MARK_PATTERN.match(text, orig_end)
+        return end_match.end() if end_match else orig_end
+
+    # ]{.frame}** / ]{.underline}** / ]{.frame} / ]{.underline} パターン（orig_end直後）
+    end_match = _END_BRACKET_CLOSE_PATTERN.match(text, orig_end)
+    if end_match:
+        return end_match.end()
+
+    frame_pos = text.find(']{.frame}', orig_end)
+    underline_pos = text.find(']{.underline}', orig_end)
+    # スペース+]{.frame}パターン（スペースを含む場合、15文字以内に収まるもの）
+    if frame_pos >= 0 and frame_pos - orig_end + len(']{.frame}') <= 15:
+        return frame_pos + len(']{.frame}')
+    # スペース+]{.underline}パターン（スペースを含む場合、20文字以内に収まるもの）
+    if underline_pos >= 0 and underline_pos - orig_end + len(']{.underline}') <= 20:
+        return underline_pos + len(']{.underline}')
+    # 未閉じの[がある場合、距離制限なしで]{.frame/underline}を検索
+    # （開始位置で[を含めたので、対応する閉じ記号も含める必要がある）
+    if frame_pos >= 0:
+        if text.find('[', orig_end, frame_pos) < 0:
+            return frame_pos + len(']{.frame}')
+        return orig_end
+    if underline_pos >= 0:
+        if text.find('[', orig_end, underline_pos) < 0:
+            return underline_pos + len(']{.underline}')
+        return orig_end
+    # **（単独のstrong）/ ~（subscript終了）/ ^（superscript終了）
+    end_match = _END_MARK_PATTERN.match(text, orig_end)
+    return end_match.end() if end_match else orig_end
 
 
 def get_original_range(text: str, reading_start: int, reading_len: int) -> tuple[int, int]:
@@ -558,14 +656,17 @@ def get_original_range(text: str, reading_start: int, reading_len: int) -> tuple
     --------
     reading_pos_to_original : 単一位置の変換に使用。
     """
-    orig_start = reading_pos_to_original(text, reading_start)
-    orig_end = reading_pos_to_original(text, reading_start + reading_len)
+    # 開始・終了位置の変換で、数式プロセッサの取得とテキストの分割を共有する
+    from mathconv.converter import get_current_processor
+    math_proc = get_current_processor()
+    segments = _tokenize(text, math_proc)
+    orig_start = _segments_pos_to_original(text, segments, reading_start, math_proc)
+    orig_end = _segments_pos_to_original(text, segments, reading_start + reading_len, math_proc)
 
     # orig_endが新しいbracket構文([...]{.frame/underline})の直後に入っている場合、
     # 構文の前に戻す（reading_pos_to_originalが内部offset=0で構文内に入るため）
     if orig_end > orig_start and orig_end >= 1 and text[orig_end - 1] == '[':
-        remaining_from_bracket = text[orig_end - 1:]
-        if UNDERLINE_PATTERN.match(remaining_from_bracket) or FRAME_PATTERN.match(remaining_from_bracket):
+        if UNDERLINE_PATTERN.match(text, orig_end - 1) or FRAME_PATTERN.match(text, orig_end - 1):
             orig_end -= 1
 
     # orig_end が書式パターン内部に入っている場合、パターン開始位置まで戻す
@@ -585,12 +686,11 @@ def get_original_range(text: str, reading_start: int, reading_len: int) -> tuple
     # 範囲内に]{.underline}や]{.frame}が含まれているが対応する[がない場合、
     # 書式マーカーを除外する（長い[text]{.underline}構文の途中で発生）
     if orig_end > orig_start:
-        range_text = text[orig_start:orig_end]
-        for marker in [']{.underline}', ']{.frame}']:
-            marker_idx = range_text.find(marker)
-            if marker_idx >= 0 and '[' not in range_text[:marker_idx]:
+        for marker in (']{.underline}', ']{.frame}'):
+            marker_pos = text.find(marker, orig_start, orig_end)
+            if marker_pos >= 0 and text.find('[', orig_start, marker_pos) < 0:
                 # 対応する[がない — 書式マーカーを除外してコンテンツのみにする
-                orig_end = orig_start + marker_idx
+                orig_end = marker_pos
                 break
 
     # 書式記法の境界に拡張
@@ -598,50 +698,38 @@ def get_original_range(text: str, reading_start: int, reading_len: int) -> tuple
 
     # orig_startが[...]{.frame/underline}構文の内部にあるかを厳密チェック
     inside_bracket = False
-    bracket_pos = None
-    if orig_start >= 1:
-        # 後方に[を検索（途中に]があれば中断）
-        for back in range(1, min(16, orig_start + 1)):
-            ch = text[orig_start - back]
-            if ch == '[':
-                # [を見つけた。前方に]{.frame}か]{.underline}があり、途中に[がないか確認
-                after = text[orig_start:]
-                frame_idx = after.find(']{.frame}')
-                underline_idx = after.find(']{.underline}')
-                end_idx = -1
-                if frame_idx >= 0 and (underline_idx < 0 or frame_idx <= underline_idx):
-                    end_idx = frame_idx
-                elif underline_idx >= 0:
-                    end_idx = underline_idx
-                if end_idx >= 0 and '[' not in after[:end_idx]:
-                    # frame構文のみ展開（短い構文を1スパンにする）
-                    # underline構文は展開しない（長い構文の各単語を個別スパンにする）
-                    if after[end_idx:].startswith(']{.frame}'):
-                        inside_bracket = True
-                        bracket_pos = orig_start - back
-                break
-            elif ch == ']':
-                break  # 別の構文の境界に到達
+    # 後方15文字以内で最も近い[を検索（それより近くに]があれば別の構文の境界）
+    window_start = max(0, orig_start - 15)
+    bracket_pos = text.rfind('[', window_start, orig_start)
+    if bracket_pos >= 0 and text.rfind(']', bracket_pos, orig_start) < 0:
+        # 前方に]{.frame}があり、それより手前に]{.underline}も[もないか確認
+        # frame構文のみ展開（短い構文を1スパンにする）
+        # underline構文は展開しない（長い構文の各単語を個別スパンにする）
+        frame_idx = text.find(']{.frame}', orig_start)
+        if (frame_idx >= 0
+                and text.find(']{.underline}', orig_start, frame_idx) < 0
+                and text.find('[', orig_start, frame_idx) < 0):
+            inside_bracket = True
 
     if inside_bracket:
         # 構文内部: [まで拡張（さらに**があれば含む）
-        if bracket_pos >= 2 and text[bracket_pos - 2:bracket_pos] == '**':
+        if bracket_pos >= 2 and text.startswith('**', bracket_pos - 2):
             orig_start = bracket_pos - 2
         else:
             orig_start = bracket_pos
     else:
         # 構文外: 個別の書式マーカーをチェック
-        if orig_start >= 3 and text[orig_start-3:orig_start] == '**[':
+        if orig_start >= 3 and text.startswith('**[', orig_start - 3):
             # **[はframe構文の場合のみ展開
-            if FRAME_PATTERN.match(text[orig_start-1:]):
+            if FRAME_PATTERN.match(text, orig_start - 1):
                 orig_start -= 3
             else:
                 orig_start -= 2  # **のみ展開（[は含めない）
-        elif orig_start >= 2 and text[orig_start-2:orig_start] == '**':
+        elif orig_start >= 2 and text.startswith('**', orig_start - 2):
             orig_start -= 2
         elif orig_start >= 1 and text[orig_start-1] == '[':
             # [はframe構文の場合のみ展開（underlineは個別単語スパンのため展開しない）
-            if FRAME_PATTERN.match(text[orig_start-1:]):
+            if FRAME_PATTERN.match(text, orig_start - 1):
                 orig_start -= 1
         elif orig_start >= 1 and text[orig_start-1] == '~':
             orig_start -= 1
@@ -649,62 +737,10 @@ def get_original_range(text: str, reading_start: int, reading_len: int) -> tuple
             orig_start -= 1
 
     # 終了位置の後の書式記法を含める
-    remaining_end = text[orig_end:]
     # ]{.frame/underline}拡張は、範囲内に未閉じの[がある場合のみ行う
     # （長い[text]{.underline}構文の途中で]{.underline}だけ含めると壊れた断片になる）
-    range_text = text[orig_start:orig_end]
-    has_unmatched_bracket = range_text.count('[') > range_text.count(']')
-
-    if has_unmatched_bracket:
-        # ]{.frame}**パターン
-        if remaining_end.startswith(']{.frame}**'):
-            orig_end += len(']{.frame}**')
-        # ]{.underline}**パターン
-        elif remaining_end.startswith(']{.underline}**'):
-            orig_end += len(']{.underline}**')
-        # ]{.frame}パターン
-        elif remaining_end.startswith(']{.frame}'):
-            orig_end += len(']{.frame}')
-        # ]{.underline}パターン
-        elif remaining_end.startswith(']{.underline}'):
-            orig_end += len(']{.underline}')
-        # スペース+]{.frame}パターン（スペースを含む場合）
-        elif ']{.frame}' in remaining_end[:15]:
-            frame_pos = remaining_end.find(']{.frame}')
-            orig_end += frame_pos + len(']{.frame}')
-        # スペース+]{.underline}パターン（スペースを含む場合）
-        elif ']{.underline}' in remaining_end[:20]:
-            underline_pos = remaining_end.find(']{.underline}')
-            orig_end += underline_pos + len(']{.underline}')
-        # 未閉じの[がある場合、距離制限なしで]{.frame/underline}を検索
-        # （開始位置で[を含めたので、対応する閉じ記号も含める必要がある）
-        elif ']{.frame}' in remaining_end:
-            frame_pos = remaining_end.find(']{.frame}')
-            if '[' not in remaining_end[:frame_pos]:
-                orig_end += frame_pos + len(']{.frame}')
-        elif ']{.underline}' in remaining_end:
-            underline_pos = remaining_end.find(']{.underline}')
-            if '[' not in remaining_end[:underline_pos]:
-                orig_end += underline_pos + len(']{.underline}')
-        # **パターン（単独のstrong）
-        elif orig_end <= len(text) - 2 and text[orig_end:orig_end+2] == '**':
-            orig_end += 2
-        # ~パターン（subscript終了）
-        elif orig_end < len(text) and text[orig_end] == '~':
-            orig_end += 1
-        # ^パターン（superscript終了）
-        elif orig_end < len(text) and text[orig_end] == '^':
-            orig_end += 1
-    else:
-        # 未閉じの[がない場合、]{.frame/underline}拡張はスキップ
-        # **パターン（単独のstrong）
-        if orig_end <= len(text) - 2 and text[orig_end:orig_end+2] == '**':
-            orig_end += 2
-        # ~パターン（subscript終了）
-        elif orig_end < len(text) and text[orig_end] == '~':
-            orig_end += 1
-        # ^パターン（superscript終了）
-        elif orig_end < len(text) and text[orig_end] == '^':
-            orig_end += 1
+    has_unmatched_bracket = text.count('[', orig_start, orig_end) > text.count(']', orig_start, orig_end)
+
+    orig_end = _expand_end(text, orig_end, has_unmatched_bracket)
 
     return orig_start, orig_end
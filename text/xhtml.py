@@ -6,12 +6,45 @@ XMLからXSLT変換で生成されたXHTMLコンテンツの処理、
 """
 import re
 
+from text.common import (
+    MATHML_PATTERN,
+    XHTML_RUBY_PATTERN,
+    XHTML_TAG_PATTERN,
+    XHTML_YOMI_SPAN_PATTERN,
+    TextNormalizer,
+    compile_alternation,
+)
+
 # インライン要素のパターン（ruby, u, strong, sub, sup, em）
 INLINE_ELEMENT_PATTERN = re.compile(
     r'<(ruby|u|strong|sub|sup|em)\b[^>]*>.*?</\1>',
     re.DOTALL
 )
 
+# xhtml_reading_pos_to_original 用: 各要素を1回の match で判定する（並び順が判定の優先順位）
+# インライン要素は閉じタグを名前付き後方参照で対応させる（group(1): 要素名, group(2): 内部）
+_INLINE_CONTENT_PATTERN = re.compile(
+    r'<(?P<inline_tag>u|strong|sub|sup|em)\b[^>]*>(.*?)</(?P=inline_tag)>',
+    re.DOTALL
+)
+_XHTML_TOKEN_PATTERN = compile_alternation([
+    ('math', MATHML_PATTERN),
+    ('ruby', XHTML_RUBY_PATTERN),
+    ('yomi', XHTML_YOMI_SPAN_PATTERN),
+    ('inline', _INLINE_CONTENT_PATTERN),
+    ('tag', XHTML_TAG_PATTERN),
+])
+_XHTML_GROUP_INDEX = _XHTML_TOKEN_PATTERN.groupindex
+
+# _balance_xhtml_tags 用: 平衡化の対象となるインライン要素の開始・閉じタグ
+_BALANCE_TAG_PATTERN = re.compile(r'<(/?)(ruby|u|strong|sub|sup|em)\b[^>]*>')
+
+# normalize_xhtml_text 用の変換テーブル（括弧の正規化 + 全角数字→半角数字）
+_NORMALIZE_TRANS = str.maketrans({
+    **TextNormalizer.BRACKET_MAP,
+    **dict(zip(TextNormalizer.FULLWIDTH_DIGITS, TextNormalizer.HALFWIDTH_DIGITS)),
+})
+
 
 def normalize_xhtml_text(xhtml: str) -> str:
     """
@@ -37,59 +70,47 @@ def normalize_xhtml_text(xhtml: str) -> str:
     - ruby要素: rt（ルビ）部分のみ抽出、rb（親字）は除去
     - その他のタグ: 除去してテキスト内容のみ残す
     """
+    # タグを含まないテキスト（単語単位の照合では大半）は文字変換のみ
+    if '<' not in xhtml:
+        return xhtml.translate(_NORMALIZE_TRANS)
+
     result = xhtml
 
     # math要素: SREで音声テキストに変換（TextGridマッチング用）
-    from mathconv.converter import get_current_processor, mathml_to_speech_xml
-    math_proc = get_current_processor()
-    sre_lang = math_proc.sre_lang if math_proc else "ja"
+    if '<math' in result:
+        from mathconv.converter import get_current_processor, mathml_to_speech_xml
+        math_proc = get_current_processor()
+        sre_lang = math_proc.sre_lang if math_proc else "ja"
 
-    def _replace_math_with_speech(m: re.Match) -> str:
-        mathml = m.group(0)
-        return mathml_to_speech_xml(mathml, sre_lang)
+        def _replace_math_with_speech(m: re.Match) -> str:
+            mathml = m.group(0)
+            return mathml_to_speech_xml(mathml, sre_lang)
 
-    result = re.sub(r'<math\b[^>]*>.*?</math>', _replace_math_with_speech, result, flags=re.DOTALL)
+        result = MATHML_PATTERN.sub(_replace_math_with_speech, result)
 
     # ruby要素: <ruby><rb>親字</rb><rt>読み</rt></ruby> → 読み
-    result = re.sub(r'<ruby><rb>.*?</rb><rt>(.*?)</rt></ruby>', r'\1', result)
+    if '<ruby>' in result:
+        result = XHTML_RUBY_PATTERN.sub(r'\2', result)
 
     # data-yomi属性付きspan: 表示テキストをyomi値に置換
-    result = re.sub(
-        r'<span\b[^>]*\bdata-yomi="([^"]*)"[^>]*>.*?</span>',
-        r'\1',
-        result
-    )
+    if 'data-yomi=' in result:
+        result = XHTML_YOMI_SPAN_PATTERN.sub(r'\1', result)
 
     # その他すべてのタグを除去
-    result = re.sub(r'<[^>]+>', '', result)
-
-    # 括弧の正規化
-    result = (result
-              .replace("（", "(").replace("）", ")")
-              .replace("「", "[").replace("」", "]")
-              .replace("『", "[").replace("』", "]"))
+    result = XHTML_TAG_PATTERN.sub('', result)
 
-    # 全角数字を半角に変換
-    zen_digits = "０１２３４５６７８９"
-    han_digits = "0123456789"
-    for z, h in zip(zen_digits, han_digits):
-        result = result.replace(z, h)
-
-    return result
+    # 括弧の正規化と全角数字の半角化（1回の走査で変換）
+    return result.translate(_NORMALIZE_TRANS)
 
 
 def _get_inner_text_length(xhtml: str) -> int:
     """XHTML要素の内部テキスト長（タグ除去後）を取得する。"""
     # ruby要素: rt部分の長さ
-    text = re.sub(r'<ruby><rb>.*?</rb><rt>(.*?)</rt></ruby>', r'\1', xhtml)
+    text = XHTML_RUBY_PATTERN.sub(r'\2', xhtml)
     # data-yomi属性付きspan: yomi値の長さで計算
-    text = re.sub(
-        r'<span\b[^>]*\bdata-yomi="([^"]*)"[^>]*>.*?</span>',
-        r'\1',
-        text
-    )
+    text = XHTML_YOMI_SPAN_PATTERN.sub(r'\1', text)
     # その他のタグを除去
-    text = re.sub(r'<[^>]+>', '', text)
+    text = XHTML_TAG_PATTERN.sub('', text)
     return len(text)
 
 
@@ -117,79 +138,66 @@ def xhtml_reading_pos_to_original(xhtml: str, reading_pos: int) -> int:
     _math_proc = get_current_processor()
     _sre_lang = _math_proc.sre_lang if _math_proc else "ja"
 
-    while current_reading_pos < reading_pos and original_pos < len(xhtml):
-        remaining = xhtml[original_pos:]
-
-        # math要素のチェック: <math ...>...</math>（原子的に扱う）
-        math_match = re.match(r'<math\b[^>]*>.*?</math>', remaining, re.DOTALL)
-        if math_match:
-            mathml = math_match.group(0)
-            speech = mathml_to_speech_xml(mathml, _sre_lang)
-            reading_len = len(speech)
-            if current_reading_pos + reading_len <= reading_pos:
-                current_reading_pos += reading_len
-                original_pos += len(math_match.group(0))
-                continue
-            else:
-                # math要素内でreading_posに達した場合、要素全体を含める
-                break
-
-        # ruby要素のチェック: <ruby><rb>...</rb><rt>...</rt></ruby>
-        ruby_match = re.match(r'<ruby><rb>(.*?)</rb><rt>(.*?)</rt></ruby>', remaining)
-        if ruby_match:
-            reading_len = len(ruby_match.group(2))  # rt部分（読み）の長さ
-            if current_reading_pos + reading_len <= reading_pos:
-                current_reading_pos += reading_len
-                original_pos += len(ruby_match.group(0))
-                continue
-            else:
-                # ruby内でreading_posに達した場合、ruby全体を含める
-                break
-
-        # data-yomi属性付きspanのチェック
-        yomi_match = re.match(
-            r'<span\b[^>]*\bdata-yomi="([^"]*)"[^>]*>.*?</span>',
-            remaining
-        )
-        if yomi_match:
-            yomi_text = yomi_match.group(1)
-            reading_len = len(yomi_text)
-            if current_reading_pos + reading_len <= reading_pos:
-                current_reading_pos += reading_len
-                original_pos += len(yomi_match.group(0))
-                continue
-            else:
-                # yomi内でreading_posに達した場合、span全体を含める
-                break
-
-        # インライン要素のチェック: <tag>...</tag>
-        inline_match = re.match(r'<(u|strong|sub|sup|em)\b[^>]*>(.*?)</\1>', remaining, re.DOTALL)
-        if inline_match:
-            inner_content = inline_match.group(2)
+    xhtml_len = len(xhtml)
+    while current_reading_pos < reading_pos and original_pos < xhtml_len:
+        # すべての要素・タグは "<" で始まるため、それ以外は通常の文字。
+        # 次の "<" の手前まで（reading_posを超えない範囲で）まとめて進める
+        if xhtml[original_pos] != '<':
+            next_lt = xhtml.find('<', original_pos + 1)
+            run_end = xhtml_len if next_lt < 0 else next_lt
+            step = min(run_end - original_pos, reading_pos - current_reading_pos)
+            current_reading_pos += step
+            original_pos += step
+            continue
+
+        # 文字列を切り出さず、位置を指定して1回で判定
+        token_match = _XHTML_TOKEN_PATTERN.match(xhtml, original_pos)
+        if token_match is None:
+            # 閉じていない "<" などは通常の文字
+            current_reading_pos += 1
+            original_pos += 1
+            continue
+
+        kind = token_match.lastgroup
+        group = _XHTML_GROUP_INDEX[kind]
+        match_len = token_match.end() - original_pos
+
+        if kind == 'tag':
+            # タグ自体はスキップ（読みテキストには含まれない）
+            original_pos += match_len
+            continue
+
+        if kind == 'inline':
+            # インライン要素: <tag>...</tag>
+            inner_content = token_match.group(group + 2)
             inner_reading_len = _get_inner_text_length(inner_content)
             if current_reading_pos + inner_reading_len <= reading_pos:
                 current_reading_pos += inner_reading_len
-                original_pos += len(inline_match.group(0))
+                original_pos += match_len
                 continue
-            else:
-                # 要素内でreading_posに達した場合、開始タグの後に進む
-                tag_len = len(f'<{inline_match.group(1)}>')
-                original_pos += tag_len
-                # 内部コンテンツを再帰的に処理
-                inner_offset = reading_pos - current_reading_pos
-                inner_pos = xhtml_reading_pos_to_original(inner_content, inner_offset)
-                return original_pos + inner_pos
-
-        # 開始タグのチェック: <tag> または <tag attr="...">
-        tag_match = re.match(r'<[^>]+>', remaining)
-        if tag_match:
-            # タグ自体はスキップ（読みテキストには含まれない）
-            original_pos += len(tag_match.group(0))
+            # 要素内でreading_posに達した場合、開始タグの後に進む
+            tag_len = len(f'<{token_match.group(group + 1)}>')
+            original_pos += tag_len
+            # 内部コンテンツを再帰的に処理
+            inner_offset = reading_pos - current_reading_pos
+            inner_pos = xhtml_reading_pos_to_original(inner_content, inner_offset)
+            return original_pos + inner_pos
+
+        if kind == 'math':
+            # math要素: SRE音声テキストの長さ（原子的に扱う）
+            reading_len = len(mathml_to_speech_xml(token_match.group(group), _sre_lang))
+        elif kind == 'ruby':
+            # ruby要素: rt部分（読み）の長さ
+            reading_len = len(token_match.group(group + 2))
+        else:
+            # data-yomi属性付きspan: yomi値の長さ
+            reading_len = len(token_match.group(group + 1))
+        if current_reading_pos + reading_len <= reading_pos:
+            current_reading_pos += reading_len
+            original_pos += match_len
             continue
-
-        # 通常の文字
-        current_reading_pos += 1
-        original_pos += 1
+        # 要素内でreading_posに達した場合、要素全体を含める
+        break
 
     return original_pos
 
@@ -215,13 +223,14 @@ def _balance_xhtml_tags(xhtml: str, start: int, end: int) -> tuple[int, int]:
     tuple[int, int]
         平衡化された (開始位置, 終了位置)。
     """
-    extracted = xhtml[start:end]
+    # 範囲内にタグがなければ平衡化は不要（単語単位の範囲ではこれが大半）
+    if xhtml.find('<', start, end) < 0:
+        return start, end
 
-    # タグを出現順に取得
-    tag_pattern = re.compile(r'<(/?)(ruby|u|strong|sub|sup|em)\b[^>]*>')
+    # 範囲内のタグを出現順に取得（範囲を切り出さず、位置を指定して走査）
     tag_stack = []
 
-    for match in tag_pattern.finditer(extracted):
+    for match in _BALANCE_TAG_PATTERN.finditer(xhtml, start, end):
         is_close = match.group(1) == '/'
         tag_name = match.group(2)
 
@@ -239,10 +248,9 @@ def _balance_xhtml_tags(xhtml: str, start: int, end: int) -> tuple[int, int]:
 
     for tag in reversed(tag_stack):
         close_tag = f'</{tag}>'
-        remaining = xhtml[search_start:]
-        close_pos = remaining.find(close_tag)
+        close_pos = xhtml.find(close_tag, search_start)
         if close_pos != -1:
-            new_end = search_start + close_pos + len(close_tag)
+            new_end = close_pos + len(close_tag)
             search_start = new_end
 
     return start, new_end
@@ -1,6 +1,29 @@
 import os
-from datetime import datetime, timedelta
-from typing import List, Final
+import re
+import time
+from typing import Iterator, Final
+
+# 分割処理は文字列の検索と切り出しだけなので、str.find / re 等のC実装の処理に任せる
+# （文字列処理が主体のため、Numba等のJITによる高速化は対象外）
+
+# 見出し行の先頭の#の並び（行頭の#+、長さが見出しレベル）
+_HEADING_LINE_PATTERN: Final[re.Pattern[str]] = re.compile(r'^#+', re.MULTILINE)
+
+
+def _iter_sections(data: str) -> Iterator[tuple[int, str]]:
+    # 見出し行（#で始まる行）の位置で区切ったセクションを、見出しレベル
+    # （先頭の#の数。見出しで始まらないプロローグは0）と組にして先頭から順に返す
+    # （全セクションをリストに溜めず、書き出したセクションから解放されるようにする）
+    first_heading = _HEADING_LINE_PATTERN.match(data)
+    level: int = first_heading.end() if first_heading else 0
+    section_start: int = 0
+    # 先頭行が見出しの場合は空のセクションを返さないよう、2文字目から探す
+    for heading in _HEADING_LINE_PATTERN.finditer(data, 1):
+        yield level, data[section_start:heading.start()]
+        level = heading.end() - heading.start()
+        section_start = heading.start()
+    if section_start < len(data):
+        yield level, data[section_start:]
 
 
 def split_text_file() -> None:
@@ -11,71 +34,60 @@ def split_text_file() -> None:
         print(f"エラー: ファイルが見つかりません: {input_path}")
         return
 
-    start_time: datetime = datetime.now()
+    start_time: float = time.perf_counter()
 
     base_dir: str = os.path.dirname(input_path)
     full_name: str = os.path.basename(input_path)
-    file_name_wo_ext: str = os.path.splitext(full_name)[0]
-    ext: str = os.path.splitext(full_name)[1]
-
-    sections: List[List[str]] = []
-    current_section: List[str] = []
+    file_name_wo_ext, ext = os.path.splitext(full_name)
+    # 出力パスの共通部分（セクションごとに異なるのはサフィックスのみ）
+    output_prefix: str = os.path.join(base_dir, file_name_wo_ext)
 
     try:
+        # 2. 全体を一度に読み込む
         with open(input_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.startswith('#'):
-                    if current_section:
-                        sections.append(current_section)
-                    current_section = [line]
-                else:
-                    current_section.append(line)
-
-            if current_section:
-                sections.append(current_section)
-
-        # 3. ファイル書き出し
+            data: str = f.read()
+
+        # 3. 見出し行の位置で分割しながら、セクションごとにファイル書き出し
         h2_count: int = 1
-        for section in sections:
+        for level, section in _iter_sections(data):
             # --- 末尾の空行を削除する処理 ---
-            # rstrip()で改行や空白を消した結果、空になる要素を後ろから削る
-            while section and not section[-1].strip():
-                section.pop()
-
-            if not section:
+            # rstrip()で改行や空白を消した結果が空なら、空行のみのセクション
+            content_end: int = len(section.rstrip())
+            if not content_end:
                 continue
 
-            # 最後の行だけ改行を取り除く（ファイル末尾の改行を完全に無くしたい場合）
-            # もし「行としての改行は残したいが空行は不要」なら、while文だけでOKです。
-            # ここでは「ファイルの一番最後が改行文字で終わらない」ように処理します。
-            section[-1] = section[-1].rstrip('\n')
+            # 最後の非空行の改行より後ろ（末尾の空行）を削る。
+            # その行の改行も取り除き、「ファイルの一番最後が改行文字で終わらない」ようにする。
+            # （最後の非空行の行末の空白はそのまま残す）
+            line_end: int = section.find('\n', content_end)
+            if line_end >= 0:
+                section = section[:line_end]
             # ------------------------------
 
-            first_line: str = section[0]
+            # 見出しレベルで出力ファイルのサフィックスを決める（### 以下も ## と同じ連番）
             suffix: str = ""
-            if first_line.startswith('##'):
+            if level >= 2:
                 suffix = f"_{h2_count}"
                 h2_count += 1
-            elif first_line.startswith('#'):
+            elif level == 1:
                 suffix = "_0"
             else:
                 suffix = "_prologue"
 
-            output_path: str = os.path.join(base_dir, f"{file_name_wo_ext}{suffix}{ext}")
+            output_path: str = f"{output_prefix}{suffix}{ext}"
 
             with open(output_path, 'w', encoding='utf-8') as out_f:
-                out_f.writelines(section)
+                out_f.write(section)
             print(f"保存完了: {os.path.basename(output_path)}")
 
     except Exception as e:
         print(f"エラーが発生しました: {e}")
         return
 
-    end_time: datetime = datetime.now()
-    duration: timedelta = end_time - start_time
+    duration: float = time.perf_counter() - start_time
 
     print("-" * 30)
-    print(f"処理時間: {duration.total_seconds():.4f} 秒")
+    print(f"処理時間: {duration:.4f} 秒")
     print("-" * 30)
 
 